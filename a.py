@@ -1,3 +1,14 @@
+from random import sample
+from timeit import default_timer
+
+try:
+  import numpy as np
+except ImportError:  # NumPy が無ければ Python の多倍長整数でビット演算する
+  np = None
+
+# 人数がこれ以上なら NumPy の uint64 配列でマスクを持つ
+NUMPY_MIN_PEOPLE = 4096
+
 def create_attendee_mask(attendee_list: list[int]) -> int:
   """舞踏会の参加者リストからビットマスクを生成する"""
   # attendee_list[0]は参加人数kであり、この関数では不要
@@ -7,16 +18,10 @@ def create_attendee_mask(attendee_list: list[int]) -> int:
     mask |= 1 << (person_id - 1)
   return mask
 
-def main():
-  num_people, num_parties = map(int, input().split())
-  
-  party_masks = []
-  for _ in range(num_parties):
-    party_info = list(map(int, input().split()))
-    party_masks.append(create_attendee_mask(party_info))
-  
+def solve_naive(num_people: int, party_masks: list[int]) -> bool:
+  """全員が全員と知り合いか（人ごとに全舞踏会のマスクを調べる元の方法、O(N·M)）"""
   all_people_mask = (1 << num_people) - 1
-  
+
   satisfied_people_count = 0
   for i in range(num_people):
     person_bit = 1 << i
@@ -24,11 +29,120 @@ def main():
     for party_mask in party_masks:
       if party_mask & person_bit: # iさんがこの舞踏会に参加していたら
         acquaintance_mask |= party_mask # 知り合いの輪に加える
-    
+
     if acquaintance_mask == all_people_mask:
       satisfied_people_count += 1
-      
-  print('Yes' if satisfied_people_count == num_people else 'No')
+
+  return satisfied_people_count == num_people
+
+def solve(num_people: int, parties: list[list[int]]) -> bool:
+  """全員が全員と知り合いか（parties は各舞踏会の参加者番号のリスト、1-indexed）
+
+  先に安く判定できる必要条件で「No」を確定させ、残ったときだけ
+  人ごとに「自分が参加した舞踏会」のマスクだけを OR する。
+  計算量は参加者数の合計 S に対して O(S·N/64) 語の演算になる。
+
+  >>> solve(3, [[1, 2], [2, 3], [1, 3]])
+  True
+  >>> solve(3, [[1, 2], [2, 3]])
+  False
+  """
+  if num_people <= 0:
+    return True
+  members = [sorted(set(party)) for party in parties]
+
+  # 1. 全員を含む舞踏会があれば、それだけで全員が知り合い
+  if any(len(m) == num_people for m in members):
+    return True
+  # 2. 知り合いになれる組の数の上限が、必要な組の数に届かなければ No
+  pairs = sum(len(m) * (len(m) - 1) // 2 for m in members)
+  if pairs < num_people * (num_people - 1) // 2:
+    return False
+  # 3. 舞踏会でつながる人のグループが1つでなければ No（Union-Find）
+  if not _connected(num_people, members):
+    return False
+
+  # 人ごとに参加した舞踏会の番号を集める（参加者数の合計に比例）
+  parties_of = [[] for _ in range(num_people)]
+  for p, m in enumerate(members):
+    for person_id in m:
+      parties_of[person_id - 1].append(p)
+  if np is not None and num_people >= NUMPY_MIN_PEOPLE:
+    return _all_know_numpy(num_people, members, parties_of)
+  return _all_know_bigint(num_people, members, parties_of)
+
+def _connected(num_people: int, members: list[list[int]]) -> bool:
+  """同じ舞踏会の参加者を合併し、全員が1つのグループになるか調べる"""
+  parents = list(range(num_people))
+  def find(a: int) -> int:
+    while parents[a] != a:
+      parents[a] = parents[parents[a]]
+      a = parents[a]
+    return a
+  groups = num_people
+  for m in members:
+    if not m:
+      continue
+    root = find(m[0] - 1)
+    for person_id in m[1:]:
+      other = find(person_id - 1)
+      if other != root:
+        parents[other] = root
+        groups -= 1
+  return groups == 1
+
+def _all_know_bigint(num_people: int, members: list[list[int]], parties_of: list[list[int]]) -> bool:
+  masks = [create_attendee_mask([len(m)] + m) for m in members]
+  all_people_mask = (1 << num_people) - 1
+  for ps in parties_of:
+    acquaintance_mask = 0
+    for p in ps:
+      acquaintance_mask |= masks[p]
+    if acquaintance_mask != all_people_mask:
+      return False
+  return True
+
+def _all_know_numpy(num_people: int, members: list[list[int]], parties_of: list[list[int]]) -> bool:
+  # 舞踏会ごとのマスクを uint64 の語の配列（M 行 × ceil(N/64) 列）で持つ
+  words = (num_people + 63) // 64
+  rows = np.repeat(np.arange(len(members)), [len(m) for m in members])
+  ids = np.fromiter((person_id - 1 for m in members for person_id in m), dtype=np.int64, count=len(rows))
+  masks = np.zeros((len(members), words), dtype=np.uint64)
+  np.bitwise_or.at(masks, (rows, ids >> 6), np.left_shift(np.uint64(1), (ids & 63).astype(np.uint64)))
+  full = np.full(words, np.iinfo(np.uint64).max, dtype=np.uint64)
+  if num_people % 64:
+    full[-1] = np.uint64((1 << (num_people % 64)) - 1)
+  for ps in parties_of:
+    if not np.array_equal(np.bitwise_or.reduce(masks[ps], axis=0), full):
+      return False
+  return True
+
+def benchmark(num_people: int = 2000, num_parties: int = 2000, party_size: int = 200) -> None:
+  """ランダムな入力で元のループ (solve_naive) と solve の時間を比べる"""
+  # 既定の大きさなら、ほぼ確実に全員が知り合い（早期に No で終わらない最悪ケース）になる
+  parties = [sample(range(1, num_people + 1), party_size) for _ in range(num_parties)]
+  masks = [create_attendee_mask([len(p)] + p) for p in parties]
+  start = default_timer()
+  expected = solve_naive(num_people, masks)
+  t_naive = default_timer() - start
+  start = default_timer()
+  got = solve(num_people, parties)
+  t_fast = default_timer() - start
+  assert got == expected
+  engine = "numpy" if np is not None and num_people >= NUMPY_MIN_PEOPLE else "bigint"
+  print(f"N={num_people} M={len(parties)} answer={'Yes' if got else 'No'}  "
+        f"naive: {t_naive:.3f}s   solve ({engine}): {t_fast:.3f}s")
+
+def main():
+  num_people, num_parties = map(int, input().split())
+
+  parties = []
+  for _ in range(num_parties):
+    party_info = list(map(int, input().split()))
+    # 先頭の参加人数 k を除いた参加者番号だけを渡す
+    parties.append(party_info[1:])
+
+  print('Yes' if solve(num_people, parties) else 'No')
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,15 +1,248 @@
-def heap_sort(arr,p=None):
-    if p==None:
-        p=(len(arr)-2)//2
-    if p==0:
-        return arr
-    if p*2+1<len(arr):
-        if arr[p]>arr[p*2+1]:
-            arr[p],arr[p*2+1]=arr[(p*2+1)//2],arr[p]
-            return heap_sort(arr,p*2)
-    if p*2+2<len(arr):
-        if arr[p]>arr[p*2+2]:
-            arr[p],arr[p*2+2]=arr[p*2+2],arr[p]
-            return heap_sort(arr,(p*2+2)//2)
-
-print(heap_sort([1,5,6,8,9,-1,0,4]))
\ No newline at end of file
+"""配列で表した二分ヒープ
+
+heap[i] の子は heap[2*i+1] と heap[2*i+2]。関数は最小ヒープを前提にし、
+heap_sort と nsmallest だけが内部で最大ヒープを使う。
+"""
+from itertools import count
+from timeit import timeit
+
+
+def sift_up(heap,pos):
+    """heap[pos] を親より小さい間だけ上へ移動する（非再帰）"""
+    x=heap[pos]
+    while pos>0:
+        parent=(pos-1)>>1
+        if not x<heap[parent]:
+            break
+        heap[pos]=heap[parent]
+        pos=parent
+    heap[pos]=x
+
+
+def sift_down(heap,pos,size=None):
+    """heap[pos] を小さい方の子より大きい間だけ下へ移動する（非再帰）"""
+    if size is None:
+        size=len(heap)
+    x=heap[pos]
+    child=2*pos+1
+    while child<size:
+        if child+1<size and heap[child+1]<heap[child]:
+            child+=1
+        if not heap[child]<x:
+            break
+        heap[pos]=heap[child]
+        pos=child
+        child=2*pos+1
+    heap[pos]=x
+
+
+def heapify(heap):
+    """リストをその場で最小ヒープにする。下の階層から sift_down するので O(n)
+
+    >>> h=[5,3,8,1,9,2]
+    >>> heapify(h)
+    >>> h[0]
+    1
+    """
+    for pos in range(len(heap)//2-1,-1,-1):
+        sift_down(heap,pos)
+
+
+def _sift_down_max(heap,pos,size):
+    """最大ヒープ版の sift_down（heap_sort / nsmallest 用）"""
+    x=heap[pos]
+    child=2*pos+1
+    while child<size:
+        if child+1<size and heap[child]<heap[child+1]:
+            child+=1
+        if not x<heap[child]:
+            break
+        heap[pos]=heap[child]
+        pos=child
+        child=2*pos+1
+    heap[pos]=x
+
+
+def heap_sort(arr):
+    """最大ヒープを使って arr をその場で昇順にソートし、arr を返す。O(n log n)
+
+    >>> heap_sort([1,5,6,8,9,-1,0,4])
+    [-1, 0, 1, 4, 5, 6, 8, 9]
+    """
+    n=len(arr)
+    for pos in range(n//2-1,-1,-1):
+        _sift_down_max(arr,pos,n)
+    for end in range(n-1,0,-1):
+        arr[0],arr[end]=arr[end],arr[0]
+        _sift_down_max(arr,0,end)
+    return arr
+
+
+def nlargest(k,iterable):
+    """大きい方から k 個を降順で返す。大きさ k の最小ヒープで O(n log k)
+
+    >>> nlargest(3,[5,1,9,3,7,9])
+    [9, 9, 7]
+    """
+    if k<=0:
+        return []
+    it=iter(iterable)
+    heap=[x for _,x in zip(range(k),it)]
+    heapify(heap)
+    for x in it:
+        # ヒープの最小値より大きいものだけ入れ替える
+        if heap[0]<x:
+            heap[0]=x
+            sift_down(heap,0)
+    return heap_sort(heap)[::-1]
+
+
+def nsmallest(k,iterable):
+    """小さい方から k 個を昇順で返す。大きさ k の最大ヒープで O(n log k)
+
+    >>> nsmallest(3,[5,1,9,3,7,1])
+    [1, 1, 3]
+    """
+    if k<=0:
+        return []
+    it=iter(iterable)
+    heap=[x for _,x in zip(range(k),it)]
+    size=len(heap)
+    for pos in range(size//2-1,-1,-1):
+        _sift_down_max(heap,pos,size)
+    for x in it:
+        if x<heap[0]:
+            heap[0]=x
+            _sift_down_max(heap,0,size)
+    return heap_sort(heap)
+
+
+class PriorityQueue:
+    """優先度付きキュー（小さい優先度から取り出す）
+
+    要素 -> ヒープ上の位置の索引を持つので、decrease_key を O(log n) で行える。
+    要素はハッシュ可能で、キュー内で重複しないこと。
+    同じ優先度の要素は先に入れたものから取り出す。
+
+    >>> pq=PriorityQueue()
+    >>> pq.push("a",5); pq.push("b",3); pq.push("c",4)
+    >>> pq.decrease_key("a",1)
+    >>> pq.pop()
+    ('a', 1)
+    >>> pq.pushpop("d",2)
+    ('d', 2)
+    >>> [pq.pop() for _ in range(len(pq))]
+    [('b', 3), ('c', 4)]
+    """
+
+    def __init__(self):
+        # エントリは [優先度, 挿入順, 要素]
+        self._heap=[]
+        self._pos={}
+        self._counter=count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self,item):
+        return item in self._pos
+
+    def peek(self):
+        """最小の (要素, 優先度) を取り出さずに返す"""
+        priority,_,item=self._heap[0]
+        return item,priority
+
+    def push(self,item,priority):
+        if item in self._pos:
+            raise KeyError(f"{item!r} is already in the queue")
+        self._heap.append([priority,next(self._counter),item])
+        self._up(len(self._heap)-1)
+
+    def pop(self):
+        """最小の (要素, 優先度) を取り出す"""
+        heap=self._heap
+        last=heap.pop()
+        if not heap:
+            del self._pos[last[2]]
+            return last[2],last[0]
+        top=heap[0]
+        heap[0]=last
+        self._down(0)
+        del self._pos[top[2]]
+        return top[2],top[0]
+
+    def pushpop(self,item,priority):
+        """push してから pop するのと同じ結果を、1回の sift_down で返す"""
+        if item in self._pos:
+            raise KeyError(f"{item!r} is already in the queue")
+        entry=[priority,next(self._counter),item]
+        if not self._heap or entry<self._heap[0]:
+            return item,priority
+        top=self._heap[0]
+        del self._pos[top[2]]
+        self._heap[0]=entry
+        self._down(0)
+        return top[2],top[0]
+
+    def decrease_key(self,item,priority):
+        """item の優先度を priority に下げる"""
+        pos=self._pos[item]
+        entry=self._heap[pos]
+        if entry[0]<priority:
+            raise ValueError("new priority is larger than the current one")
+        entry[0]=priority
+        self._up(pos)
+
+    # sift_up / sift_down と同じ処理に、位置の索引の更新を加えたもの
+    def _up(self,pos):
+        heap,index=self._heap,self._pos
+        entry=heap[pos]
+        while pos>0:
+            parent=(pos-1)>>1
+            if not entry<heap[parent]:
+                break
+            heap[pos]=heap[parent]
+            index[heap[pos][2]]=pos
+            pos=parent
+        heap[pos]=entry
+        index[entry[2]]=pos
+
+    def _down(self,pos):
+        heap,index=self._heap,self._pos
+        size=len(heap)
+        entry=heap[pos]
+        child=2*pos+1
+        while child<size:
+            if child+1<size and heap[child+1]<heap[child]:
+                child+=1
+            if not heap[child]<entry:
+                break
+            heap[pos]=heap[child]
+            index[heap[pos][2]]=pos
+            pos=child
+            child=2*pos+1
+        heap[pos]=entry
+        index[entry[2]]=pos
+
+
+def benchmark(n=100000,repeat=3):
+    """標準ライブラリの heapq と実行時間を比べる"""
+    setup=f"from random import randrange; data=[randrange({n}) for _ in range({n})]"
+    g={**globals(),"heapq":__import__("heapq")}
+    cases=[
+        ("heapify","heapify(data.copy())","heapq.heapify(data.copy())"),
+        ("heap_sort","heap_sort(data.copy())",
+         "h=data.copy(); heapq.heapify(h); [heapq.heappop(h) for _ in range(len(h))]"),
+        ("nlargest(10)","nlargest(10,data)","heapq.nlargest(10,data)"),
+        ("nsmallest(10)","nsmallest(10,data)","heapq.nsmallest(10,data)"),
+    ]
+    print(f"{n=}, {repeat=}")
+    for name,ours,std in cases:
+        t1=timeit(ours,setup=setup,number=repeat,globals=g)/repeat
+        t2=timeit(std,setup=setup,number=repeat,globals=g)/repeat
+        print(f"{name:<14} heap_sort.py: {t1:.4f}s   heapq: {t2:.4f}s")
+
+
+if __name__=="__main__":
+    print(heap_sort([1,5,6,8,9,-1,0,4]))
+    benchmark()
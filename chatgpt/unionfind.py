@@ -1,24 +1,366 @@
-class Unionfind:
-    def __init__(self,n):
-        self.parents=[i for i in range(n)]
-    
-    
-    def merge(self,a,b):
-        if self.parents[a]!=self.parents[b]:
-            r=self.find(self.parents[a])
-            l=self.find(self.parents[b])
-            self.parents[l]=r
-            
-        
-        
-    def find(self,a):
-        if self.parents[a]==a:
-            return a
-        self.parents[a]=self.find(self.parents[a])
-        return self.parents[a]
-    
-      
-uf=Unionfind(6)
-uf.merge(1,2)
-uf.merge(3,4)
-print(uf.find(1),uf.find(2),uf.find(3),uf.find(4))
\ No newline at end of file
+from array import array
+from random import randrange
+from timeit import default_timer
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無ければ connected_components は merge_many で計算する
+    np=None
+
+
+class Unionfind:
+    """Union-Find（素集合データ構造）
+
+    parents は array('i') で、根には -(集合の大きさ) を、それ以外には親の番号を持つ。
+    大きさで合併（union by size）し、find は経路半減で木を浅くする（非再帰）。
+
+    >>> uf=Unionfind(6)
+    >>> uf.merge(1,2); uf.merge(3,4); uf.merge(2,4)
+    1
+    3
+    1
+    >>> uf.same(1,3), uf.same(0,5), uf.size(4), uf.group_count
+    (True, False, 4, 3)
+    >>> uf.groups()
+    [[0], [1, 2, 3, 4], [5]]
+    """
+
+    def __init__(self,n):
+        self.parents=array('i',[-1])*n
+        self.group_count=n
+
+    def find(self,a):
+        p=self.parents
+        while True:
+            pa=p[a]
+            if pa<0:
+                return a
+            ppa=p[pa]
+            if ppa<0:
+                return pa
+            # 経路半減: 祖父を親にしながら2段ずつ上る
+            p[a]=ppa
+            a=ppa
+
+    def merge(self,a,b):
+        """a と b の集合を合併し、新しい根を返す"""
+        r=self.find(a)
+        l=self.find(b)
+        if r==l:
+            return r
+        p=self.parents
+        # 大きい方（負の値が小さい方）を根にする
+        if p[r]>p[l]:
+            r,l=l,r
+        p[r]+=p[l]
+        p[l]=r
+        self.group_count-=1
+        return r
+
+    def merge_many(self,pairs):
+        """(a, b) の組をまとめて合併し、実際に合併した回数を返す"""
+        p=self.parents
+        merged=0
+        for a,b in pairs:
+            # find をインライン展開してメソッド呼び出しを省く
+            pa=p[a]
+            while pa>=0:
+                ppa=p[pa]
+                if ppa<0:
+                    a=pa
+                    break
+                p[a]=ppa
+                a=ppa
+                pa=p[a]
+            pb=p[b]
+            while pb>=0:
+                ppb=p[pb]
+                if ppb<0:
+                    b=pb
+                    break
+                p[b]=ppb
+                b=ppb
+                pb=p[b]
+            if a==b:
+                continue
+            sa,sb=p[a],p[b]
+            if sa>sb:
+                a,b=b,a
+            p[a]=sa+sb
+            p[b]=a
+            merged+=1
+        self.group_count-=merged
+        return merged
+
+    def same(self,a,b):
+        return self.find(a)==self.find(b)
+
+    def size(self,a):
+        """a を含む集合の大きさ"""
+        return -self.parents[self.find(a)]
+
+    @classmethod
+    def from_edges(cls,n,u,v):
+        """辺の端点の列 u, v（NumPy 配列 / array / リスト）からまとめて作る
+
+        connected_components のラベルから親の配列を組み立てるので、
+        1辺ずつ merge したものと同じ集合になる（根は各集合の最小要素）。
+        """
+        labels=connected_components(n,u,v)
+        uf=cls(n)
+        p=uf.parents
+        sizes={}
+        for i,label in enumerate(labels.tolist()):
+            if i!=label:
+                p[i]=label
+            sizes[label]=sizes.get(label,0)+1
+        for label,size in sizes.items():
+            p[label]=-size
+        uf.group_count=len(sizes)
+        return uf
+
+    def labels(self):
+        """要素ごとに、その集合の最小要素を並べた array('i') を返す"""
+        smallest={}
+        out=array('i',bytes(4*len(self.parents)))
+        for i in range(len(self.parents)):
+            # 小さい順に見るので、根ごとに最初に来た要素が最小要素
+            out[i]=smallest.setdefault(self.find(i),i)
+        return out
+
+    def groups(self):
+        """集合ごとの要素のリスト（各集合の最小要素の順）"""
+        members={}
+        for i in range(len(self.parents)):
+            members.setdefault(self.find(i),[]).append(i)
+        return list(members.values())
+
+    def __len__(self):
+        return len(self.parents)
+
+
+class RollbackUnionfind:
+    """巻き戻しできる Union-Find
+
+    経路圧縮をせず大きさで合併するので木の高さは O(log n) に収まり、
+    merge のたびに変更内容を履歴に積んで undo / rollback で元に戻せる。
+    snapshot() で取った位置まで rollback(snapshot) で一度に戻せる。
+
+    >>> uf=RollbackUnionfind(4)
+    >>> uf.merge(0,1)
+    True
+    >>> cp=uf.snapshot()
+    >>> uf.merge(1,2); uf.merge(2,3)
+    True
+    True
+    >>> uf.same(0,3), uf.group_count
+    (True, 1)
+    >>> uf.rollback(cp)
+    >>> uf.same(0,3), uf.same(0,1), uf.group_count
+    (False, True, 3)
+    """
+
+    def __init__(self,n):
+        self.parents=array('i',[-1])*n
+        self.group_count=n
+        # merge ごとに (根, つないだ側の根, その大きさ)、合併しなかったときは None
+        self._history=[]
+
+    def find(self,a):
+        p=self.parents
+        while p[a]>=0:
+            a=p[a]
+        return a
+
+    def merge(self,a,b):
+        """合併したら True。履歴は合併しなかったときも1件積む"""
+        r=self.find(a)
+        l=self.find(b)
+        if r==l:
+            self._history.append(None)
+            return False
+        p=self.parents
+        if p[r]>p[l]:
+            r,l=l,r
+        self._history.append((r,l,p[l]))
+        p[r]+=p[l]
+        p[l]=r
+        self.group_count-=1
+        return True
+
+    def undo(self):
+        """直前の merge を取り消す"""
+        record=self._history.pop()
+        if record is None:
+            return
+        r,l,size_l=record
+        p=self.parents
+        p[r]-=size_l
+        p[l]=size_l
+        self.group_count+=1
+
+    def snapshot(self):
+        return len(self._history)
+
+    def rollback(self,snapshot):
+        while len(self._history)>snapshot:
+            self.undo()
+
+    def same(self,a,b):
+        return self.find(a)==self.find(b)
+
+    def size(self,a):
+        return -self.parents[self.find(a)]
+
+
+def offline_dynamic_connectivity(n,events):
+    """辺の追加・削除と連結性の問い合わせの列を、まとめて（オフラインで）処理する
+
+    events の要素は ("add", u, v) / ("remove", u, v) / ("query", u, v) /
+    ("count",) のいずれか。各辺が存在する時間区間を時間軸のセグメント木に
+    載せ、木を深さ優先でたどりながら RollbackUnionfind に合併・巻き戻しを
+    行うので、全体で O((n + q) log n log q) で済む。
+    query には連結なら True、count にはその時点の連結成分数を、
+    events の順に返す。
+
+    >>> offline_dynamic_connectivity(3,[
+    ...     ("add",0,1),("add",1,2),("query",0,2),
+    ...     ("remove",0,1),("query",0,2),("count",),("query",1,2)])
+    [True, False, 2, True]
+    """
+    T=len(events)
+    if not T:
+        return []
+    size=1
+    while size<T:
+        size*=2
+    # セグメント木の各ノードに、その区間ずっと存在する辺を載せる
+    node_edges=[[] for _ in range(2*size)]
+
+    def add_interval(lo,hi,edge):
+        lo+=size
+        hi+=size
+        while lo<hi:
+            if lo&1:
+                node_edges[lo].append(edge)
+                lo+=1
+            if hi&1:
+                hi-=1
+                node_edges[hi].append(edge)
+            lo>>=1
+            hi>>=1
+
+    # 同じ辺が複数回追加されることもあるので、追加時刻をスタックで持つ
+    opened={}
+    for t,event in enumerate(events):
+        kind=event[0]
+        if kind=="add" or kind=="remove":
+            u,v=event[1],event[2]
+            edge=(u,v) if u<v else (v,u)
+            if kind=="add":
+                opened.setdefault(edge,[]).append(t)
+            else:
+                starts=opened.get(edge)
+                if not starts:
+                    raise ValueError(f"edge {edge} removed at {t} was never added")
+                add_interval(starts.pop(),t,edge)
+        elif kind!="query" and kind!="count":
+            raise ValueError(f"unknown event {event!r}")
+    for edge,starts in opened.items():
+        for start in starts:
+            add_interval(start,T,edge)
+
+    uf=RollbackUnionfind(n)
+    answers=[]
+
+    def visit(node,lo,hi):
+        if lo>=T:
+            return
+        checkpoint=uf.snapshot()
+        for u,v in node_edges[node]:
+            uf.merge(u,v)
+        if hi-lo==1:
+            event=events[lo]
+            if event[0]=="query":
+                answers.append(uf.same(event[1],event[2]))
+            elif event[0]=="count":
+                answers.append(uf.group_count)
+        else:
+            mid=(lo+hi)//2
+            visit(2*node,lo,mid)
+            visit(2*node+1,mid,hi)
+        uf.rollback(checkpoint)
+
+    visit(1,0,size)
+    return answers
+
+
+def connected_components(n,u,v):
+    """辺 (u[i], v[i]) の連結成分を、各成分の最小要素をラベルとして返す
+
+    NumPy があれば、ラベルの小さい方へ根をつなぐ（min-label の hooking）処理と
+    ポインタジャンプ（labels = labels[labels]）をベクトル演算で繰り返し、
+    int64 の ndarray を返す。NumPy が無ければ Unionfind.merge_many で計算し、
+    array('i') を返す。どちらも Unionfind(n) に1辺ずつ merge して
+    labels() を取ったものと同じ値になる。
+
+    >>> connected_components(6,[1,3,2],[2,4,4]).tolist()
+    [0, 1, 1, 1, 1, 5]
+    """
+    if np is None:
+        uf=Unionfind(n)
+        uf.merge_many(zip(u,v))
+        return uf.labels()
+    labels=np.arange(n,dtype=np.int64)
+    u=np.asarray(u,dtype=np.int64)
+    v=np.asarray(v,dtype=np.int64)
+    while True:
+        lu=labels[u]
+        lv=labels[v]
+        pending=lu!=lv
+        if not pending.any():
+            return labels
+        # 一度同じラベルになった辺はそのままなので、残りの辺だけで続ける
+        u,v,lu,lv=u[pending],v[pending],lu[pending],lv[pending]
+        # 大きい方の根を小さい方のラベルにつなぐ（labels[x] <= x が保たれる）
+        np.minimum.at(labels,np.maximum(lu,lv),np.minimum(lu,lv))
+        # 全要素が根を直接指すまでポインタジャンプする
+        while True:
+            jumped=labels[labels]
+            if np.array_equal(jumped,labels):
+                break
+            labels=jumped
+
+
+def benchmark(n=10**6,unions=10**6):
+    """n 要素に対してランダムな unions 回の合併と find を行う"""
+    pairs=[(randrange(n),randrange(n)) for _ in range(unions)]
+    uf=Unionfind(n)
+    start=default_timer()
+    for a,b in pairs:
+        uf.merge(a,b)
+    t_merge=default_timer()-start
+    uf=Unionfind(n)
+    start=default_timer()
+    uf.merge_many(pairs)
+    t_bulk=default_timer()-start
+    start=default_timer()
+    for i in range(n):
+        uf.find(i)
+    t_find=default_timer()-start
+    print(f"{n=:,} {unions=:,}  merge: {t_merge:.2f}s   merge_many: {t_bulk:.2f}s   "
+          f"find all: {t_find:.2f}s   groups={uf.group_count:,}")
+    u=array('i',(a for a,_ in pairs))
+    v=array('i',(b for _,b in pairs))
+    start=default_timer()
+    connected_components(n,u,v)
+    engine="numpy" if np is not None else "merge_many"
+    print(f"connected_components ({engine}): {default_timer()-start:.2f}s")
+
+
+if __name__=="__main__":
+    uf=Unionfind(6)
+    uf.merge(1,2)
+    uf.merge(3,4)
+    print(uf.find(1),uf.find(2),uf.find(3),uf.find(4))
+    benchmark()
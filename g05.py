@@ -1,7 +1,27 @@
 import sys
+import io
+import contextlib
+import functools
+import gzip
+import tracemalloc
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
 from dataclasses import dataclass, field, asdict
 from collections import defaultdict
 import json
+import math
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import tempfile
+import time
+import zlib
+from itertools import chain, islice
+from heapq import heappush, heapreplace, merge, nlargest
+from threading import Condition, Lock, get_ident
 
 # --- クラス定義 ---
 # dataclassはクラスの外で定義するのが一般的です
@@ -50,40 +70,1336 @@ class Memo(BlogPost):
         print(f"Tags: {', '.join(self.tags) if self.tags else 'なし'}")
         print("--------------------------\n")
 
-class BlogSystem:
+def _make_post(post_id, title, body, tags, content_type):
+    """content_type に応じて Article か Memo を作る"""
+    if content_type == "article":
+        return Article(id=post_id, title=title, content=body, tags=tags, content_type=content_type)
+    return Memo(id=post_id, title=title, memo_body=body, tags=tags, content_type=content_type)
+
+
+def _body_of(post):
+    """記事なら content、メモなら memo_body を返す"""
+    return post.content if post.content_type == "article" else post.memo_body
+
+
+# 英数字の単語、または漢字・かな・カナの連続
+_TOKEN_RE = re.compile(r"[0-9a-z_]+|[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]+")
+
+
+def tokenize(text):
+    """検索用に文字列を語に分ける
+
+    英数字は小文字にした単語、日本語は空白で区切られないので文字の2-gram
+    （1文字だけの場合はその1文字）にする。
+
+    >>> tokenize("Python入門 the Basics")
+    ['python', '入門', 'the', 'basics']
+    >>> tokenize("全文検索")
+    ['全文', '文検', '検索']
+    """
+    tokens = []
+    for word in _TOKEN_RE.findall(text.lower()):
+        if word[0] < "\u3040":
+            tokens.append(word)
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def parse_text_query(query, mode="and"):
+    """全文検索のクエリを (語のリスト, フレーズ（語のリスト）のリスト, モード) に分ける
+
+    >>> parse_text_query('python OR "全文検索"')
+    (['python'], [['全文', '文検', '検索']], 'or')
+    """
+    phrases = [tokenize(p) for p in re.findall(r'"([^"]*)"', query)]
+    phrases = [p for p in phrases if p]
+    rest = re.sub(r'"[^"]*"', " ", query)
+    words = rest.split()
+    if "OR" in words:
+        mode = "or"
+    elif "AND" in words:
+        mode = "and"
+    terms = [t for w in words if w not in ("AND", "OR") for t in tokenize(w)]
+    return terms, phrases, mode
+
+
+class FullTextIndex:
+    """タイトルと本文の転置インデックス（BM25 でランキング）
+
+    語 -> {記事ID: 出現位置のリスト} を持つので、AND / OR の検索に加えて
+    "..." で囲んだフレーズ（語が連続して現れるもの）も検索できる。
+
+    候補が少ないクエリは全候補を語ごとにスコアリングし、上位 k 件をヒープで選ぶ。
+    候補が多いクエリは、語ごとに寄与の大きい順に並べた転置リスト（impact 順）を
+    上から同時に読み、まだ見ていない記事のスコアの上限（各リストの現在位置の
+    寄与の和）が k 位のスコアを下回った時点で打ち切る（Threshold Algorithm）。
+    条件の確認（フレーズの位置の照合を含む）とスコア計算は読んだ記事にだけ行う。
+
+    impact 順のリストは語ごとに初めて使ったときに作る。記事を加えてもリストは
+    作り直さず、その記事が含む語のリストに「後から加わった記事」として覚えておき、
+    検索のときに最初にスコアリングする。記事数や平均語数が変わった分は、
+    作ったときとの idf・平均語数の比で上限を大きめに見積もって補う。後から加わった
+    記事がリストの 1/8 を超えるか、上限の見積もりが 1.25 倍を超えたら作り直す。
+    よく出る語どうしのフレーズのように、条件を満たす記事がリストの長さに比べて
+    ずっと少ないクエリは、k 件集まるまでリストの深くまで読むことになる。
+
+    >>> index = FullTextIndex()
+    >>> for i, text in enumerate(["python python", "python", "rust", "python rust"], 1):
+    ...     index.add(i, text)
+    >>> [d for d, _ in index.search("python", k=2)]
+    [1, 2]
+    >>> [d for d, _ in index.search("python OR rust", k=4)]
+    [4, 3, 1, 2]
+    >>> index.EXHAUSTIVE_LIMIT = 0      # 少なくても impact 順で打ち切る側を通す
+    >>> [d for d, _ in index.search("python", k=2)], index.search("python", k=0)
+    ([1, 2], [])
+    """
+
+    # BM25 のパラメータ
+    K1 = 1.2
+    B = 0.75
+    # 候補がこの数以下なら impact 順のリストを使わず全候補をスコアリングする
+    EXHAUSTIVE_LIMIT = 2048
+    # impact 順のリストを作り直す条件（後から加わった記事の割合、上限の見積もりの倍率）
+    PENDING_RATIO = 1 / 8
+    MAX_BOUND_SCALE = 1.25
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._postings = {}     # 語 -> {記事ID: [位置, ...]}
+        self._doc_len = {}      # 記事ID -> 語数
+        self._total_len = 0
+        # 語 -> (寄与の大きい順の [(寄与, -記事ID), ...], 作ったときの平均語数, idf,
+        #        その後に加わった記事IDの集合)
+        self._impacts = {}
+
+    def add(self, post_id, *fields):
+        """記事の各フィールド（タイトル、本文など）を索引に加える"""
+        if post_id in self._doc_len:
+            self.remove(post_id)
+        position = 0
+        tokens = set()
+        for text in fields:
+            for token in tokenize(text):
+                self._postings.setdefault(token, {}).setdefault(post_id, []).append(position)
+                tokens.add(token)
+                position += 1
+            # フィールドをまたいだフレーズにならないよう位置を1つ空ける
+            position += 1
+        self._doc_len[post_id] = position
+        self._total_len += position
+        # この記事が含む語の impact 順のリストにだけ、後から加わった記事として記録する
+        for token in tokens:
+            cached = self._impacts.get(token)
+            if cached is not None:
+                cached[3].add(post_id)
+
+    def remove(self, post_id):
+        length = self._doc_len.pop(post_id, None)
+        if length is None:
+            return
+        self._total_len -= length
+        # impact 順のリストに残った記事は、検索のときに転置リストに無いので飛ばされる
+        for token in list(self._postings):
+            docs = self._postings[token]
+            if docs.pop(post_id, None) is not None and not docs:
+                del self._postings[token]
+                self._impacts.pop(token, None)
+
+    def search(self, query, k=10, mode="and"):
+        """クエリに合う記事の (記事ID, スコア) を、スコアの高い順に最大 k 件返す
+
+        "..." はフレーズとして常に必須、それ以外の語は mode="and" なら全て必須、
+        mode="or" なら少なくとも1つ必須。クエリ中の OR / AND でも切り替えられる。
+        k が 0 以下なら空のリストを返す。
+        """
+        if k <= 0:
+            return []
+        terms, phrases, mode = parse_text_query(query, mode)
+        phrase_terms = {t for p in phrases for t in p}
+        if self._needs_pruning(terms, phrase_terms, mode):
+            return self._search_top_k(terms, phrases, phrase_terms, mode, k)
+        if mode == "and":
+            required = set(terms) | phrase_terms
+            candidates = self._intersect(required)
+        else:
+            candidates = self._union(terms)
+            if phrase_terms:
+                must = self._intersect(phrase_terms)
+                candidates = must if not terms else candidates & must
+        for phrase in phrases:
+            candidates = {d for d in candidates if self._has_phrase(d, phrase)}
+        if not candidates:
+            return []
+
+        scores = self._bm25(candidates, set(terms) | phrase_terms)
+        return nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+    def _needs_pruning(self, terms, phrase_terms, mode):
+        """候補が EXHAUSTIVE_LIMIT を超えうるなら True（impact 順で打ち切る）"""
+        postings = self._postings
+        required = set(terms) | phrase_terms if mode == "and" else phrase_terms
+        if any(t not in postings for t in required):
+            return False
+        if required:
+            return min(len(postings[t]) for t in required) > self.EXHAUSTIVE_LIMIT
+        return sum(len(postings.get(t, ())) for t in set(terms)) > self.EXHAUSTIVE_LIMIT
+
+    def _search_top_k(self, terms, phrases, phrase_terms, mode, k):
+        """impact 順の転置リストを上から読み、上位 k 件が確定したら打ち切る"""
+        postings = self._postings
+        score_terms = [t for t in set(terms) | phrase_terms if t in postings]
+        required = set(score_terms) if mode == "and" else phrase_terms
+        optional = [postings[t] for t in set(terms) if t in postings] if mode == "or" else []
+        if mode == "or" and terms and not optional:
+            return []
+        weights = [(postings[t], self._weight(t)) for t in score_terms]
+        lists = []
+        scales = []
+        pending = set()
+        for t in score_terms:
+            impacts, scale, added = self._impact_list(t)
+            lists.append(impacts)
+            scales.append(scale)
+            pending |= added
+        is_required = [t in required for t in score_terms]
+
+        def matches(d):
+            if any(d not in postings[t] for t in required):
+                return False
+            if optional and not any(d in docs for docs in optional):
+                return False
+            return all(self._has_phrase(d, phrase) for phrase in phrases)
+
+        top = []        # (スコア, -記事ID) の最小ヒープ（k 位が先頭）
+
+        def consider(d):
+            if not matches(d):
+                return
+            score = 0.0
+            for docs, weight in weights:
+                positions = docs.get(d)
+                if positions:
+                    score += weight(d, positions)
+            item = (score, -d)
+            if len(top) < k:
+                heappush(top, item)
+            elif item > top[0]:
+                heapreplace(top, item)
+
+        # リストを作った後に加わった記事はリストに無い（位置も古い）ので、先に全部調べる
+        seen = pending
+        for d in pending:
+            consider(d)
+        depth = 0
+        while True:
+            bound = 0.0
+            active = False
+            for impacts, scale, req in zip(lists, scales, is_required):
+                if depth >= len(impacts):
+                    if req:
+                        # 必須の語のリストを読み切った = 条件を満たす記事はすべて見た
+                        active = False
+                        break
+                    continue
+                active = True
+                w, neg_id = impacts[depth]
+                bound += w * scale
+                d = -neg_id
+                if d not in seen:
+                    seen.add(d)
+                    consider(d)
+            depth += 1
+            # 浮動小数点の足し順の違いで上限をわずかに超えることがあるので余裕を持たせる
+            if not active or (len(top) >= k and top[0][0] > bound * (1 + 1e-9)):
+                break
+        return [(-neg_id, score) for score, neg_id in sorted(top, reverse=True)]
+
+    def _idf(self, term):
+        n_docs, df = len(self._doc_len), len(self._postings[term])
+        return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def _weight(self, term):
+        """(記事ID, 出現位置のリスト) からその語の BM25 の寄与を返す関数を作る"""
+        avg_len = self._total_len / len(self._doc_len)
+        doc_len = self._doc_len
+        k1, b = self.K1, self.B
+        idf = self._idf(term)
+
+        def weight(d, positions):
+            tf = len(positions)
+            return idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len[d] / avg_len))
+        return weight
+
+    def _impact_list(self, term):
+        """(寄与の大きい順（同点は ID の小さい順）の [(寄与, -記事ID), ...], 上限の倍率,
+        リストを作った後に加わった記事IDの集合) を返す
+
+        リストの寄与は作ったときの値なので、今の寄与の上限は「倍率」を掛けて見積もる。
+        BM25 の1語分は idf に比例し、平均語数が avg から avg' になると
+        (tf + K(avg)) / (tf + K(avg')) 倍になるが、これは max(1, avg' / avg) 以下。
+
+        読み取りロックの下で複数スレッドが同時に作ることがあるが、結果は同じなので
+        後から入れた方が残るだけで害はない。
+        """
+        avg_len = self._total_len / len(self._doc_len)
+        idf = self._idf(term)
+        cached = self._impacts.get(term)
+        if cached is not None:
+            impacts, built_avg, built_idf, added = cached
+            scale = idf / built_idf * max(1.0, avg_len / built_avg)
+            if len(added) <= len(impacts) * self.PENDING_RATIO and scale <= self.MAX_BOUND_SCALE:
+                return impacts, scale, set(added)
+        weight = self._weight(term)
+        impacts = sorted(((weight(d, positions), -d) for d, positions in self._postings[term].items()),
+                         reverse=True)
+        self._impacts[term] = (impacts, avg_len, idf, set())
+        return impacts, 1.0, set()
+
+    def _intersect(self, terms):
+        if not terms:
+            return set()
+        lists = [self._postings.get(t) for t in terms]
+        if any(docs is None for docs in lists):
+            return set()
+        # 一番短い転置リストから調べると確認の回数が最小になる
+        lists.sort(key=len)
+        smallest, others = lists[0], lists[1:]
+        return {d for d in smallest if all(d in docs for docs in others)}
+
+    def _union(self, terms):
+        result = set()
+        for t in terms:
+            result.update(self._postings.get(t, ()))
+        return result
+
+    def _has_phrase(self, post_id, phrase):
+        first = self._postings[phrase[0]][post_id]
+        following = [set(self._postings[t][post_id]) for t in phrase[1:]]
+        return any(all(p + i in positions for i, positions in enumerate(following, 1))
+                   for p in first)
+
+    def _bm25(self, candidates, terms):
+        """候補の記事ごとの BM25 スコアを、語ごとにまとめて足し込む"""
+        scores = dict.fromkeys(candidates, 0.0)
+        for t in terms:
+            docs = self._postings.get(t)
+            if not docs:
+                continue
+            weight = self._weight(t)
+            # 候補と転置リストの短い方だけを走査する
+            if len(candidates) <= len(docs):
+                pairs = ((d, docs.get(d)) for d in candidates)
+            else:
+                pairs = ((d, positions) for d, positions in docs.items() if d in scores)
+            for d, positions in pairs:
+                if positions:
+                    scores[d] += weight(d, positions)
+        return scores
+
+    def __len__(self):
+        return len(self._doc_len)
+
+
+# content_type <-> 列に保存するコード
+_TYPE_CODES = {"article": 0, "memo": 1}
+_TYPE_NAMES = ("article", "memo")
+
+
+class ColumnarPostStore(MutableMapping):
+    """記事を列ごとの配列にまとめて保存する {id: BlogPost} 互換のコンテナ
+
+    記事1件ごとにオブジェクト（__dict__ と tags の set）を持つ代わりに、
+    - ID・種別・本文の位置などは array の列
+    - タイトルと本文は1つの UTF-8 バッファ（bytearray）に連結
+    - タグは文字列を1度だけ登録（インターン）し、記事側は番号を array('I') で持つ
+    という形で保存する。get() / [] で取り出すたびに Article / Memo を作り直すので、
+    BlogSystem の view / list_all / search_by_tag はそのまま動く。
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._ids = array('I')              # 昇順に並べた記事ID
+        self._types = bytearray()           # _TYPE_CODES のコード
+        self._text = bytearray()            # タイトルと本文を連結したバッファ
+        self._text_start = array('Q')       # 行ごとのバッファ上の開始位置
+        self._title_len = array('I')        # タイトルのバイト数（続けて本文）
+        self._body_len = array('I')
+        self._tag_ids = array('I')          # 全記事のタグ番号を連結したもの
+        self._tag_start = array('Q')
+        self._tag_count = array('I')
+        self._tag_names = []                # タグ番号 -> タグ名
+        self._tag_codes = {}                # タグ名 -> タグ番号
+
+    def _row(self, post_id):
+        """記事IDの行番号。無ければ None"""
+        row = bisect_left(self._ids, post_id)
+        if row < len(self._ids) and self._ids[row] == post_id:
+            return row
+        return None
+
+    def _intern(self, tag):
+        code = self._tag_codes.get(tag)
+        if code is None:
+            code = self._tag_codes[tag] = len(self._tag_names)
+            self._tag_names.append(tag)
+        return code
+
+    def __getitem__(self, post_id):
+        row = self._row(post_id)
+        if row is None:
+            raise KeyError(post_id)
+        start = self._text_start[row]
+        middle = start + self._title_len[row]
+        title = self._text[start:middle].decode('utf-8')
+        body = self._text[middle:middle + self._body_len[row]].decode('utf-8')
+        tag_start = self._tag_start[row]
+        names = self._tag_names
+        tags = {names[code] for code in self._tag_ids[tag_start:tag_start + self._tag_count[row]]}
+        return _make_post(post_id, title, body, tags, _TYPE_NAMES[self._types[row]])
+
+    def __setitem__(self, post_id, post):
+        body = _body_of(post)
+        title_bytes = post.title.encode('utf-8')
+        body_bytes = body.encode('utf-8')
+        codes = [self._intern(tag) for tag in post.tags]
+        # 上書きのときは古い行を消してから入れ直す（古い文字列は未使用のまま残る）
+        if self._row(post_id) is not None:
+            del self[post_id]
+        row = bisect_left(self._ids, post_id)
+        if row == len(self._ids):
+            # 通常はIDが増える順に投稿されるので末尾への追加で済む
+            insert = lambda column, value: column.append(value)
+        else:
+            insert = lambda column, value: column.insert(row, value)
+        insert(self._ids, post_id)
+        insert(self._types, _TYPE_CODES[post.content_type])
+        insert(self._text_start, len(self._text))
+        insert(self._title_len, len(title_bytes))
+        insert(self._body_len, len(body_bytes))
+        insert(self._tag_start, len(self._tag_ids))
+        insert(self._tag_count, len(codes))
+        self._text += title_bytes
+        self._text += body_bytes
+        self._tag_ids.extend(codes)
+
+    def __delitem__(self, post_id):
+        row = self._row(post_id)
+        if row is None:
+            raise KeyError(post_id)
+        for column in (self._ids, self._types, self._text_start, self._title_len,
+                       self._body_len, self._tag_start, self._tag_count):
+            del column[row]
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, post_id):
+        return self._row(post_id) is not None
+
+
+class PostingList:
+    """昇順の記事IDの集合を、差分 + 可変長整数（varint）で圧縮して持つ転置リスト
+
+    ID は BLOCK 個ずつのブロックに分け、各ブロックの先頭の値（skip 用）と
+    バイト位置を array に、残りは直前との差分を varint にして bytearray に詰める。
+    記事IDはほぼ増える順に追加されるので add は末尾への追加で済む。
+    途中への追加は全体を作り直す（読み込み時は from_sorted、取り込み時は update で
+    まとめて加えれば作り直しは1回で済む）。
+
+    >>> ids = PostingList.from_sorted([3, 10, 200, 1000])
+    >>> ids.add(5000), ids.add(10), len(ids)
+    (True, False, 5)
+    >>> list(ids), 200 in ids, 201 in ids
+    ([3, 10, 200, 1000, 5000], True, False)
+    >>> ids.update([7, 6000, 3, 7]), list(ids)
+    (2, [3, 7, 10, 200, 1000, 5000, 6000])
+    """
+
+    BLOCK = 128
+
+    __slots__ = ("_heads", "_offsets", "_data", "_count", "_last")
+
+    def __init__(self):
+        self._heads = array('I')      # ブロックごとの先頭の値
+        self._offsets = array('Q')    # ブロックごとの差分列の開始位置
+        self._data = bytearray()      # 先頭以外の値の差分（varint）
+        self._count = 0
+        self._last = -1
+
+    @classmethod
+    def from_sorted(cls, ids):
+        """昇順（重複なし）の ID の列から作る"""
+        plist = cls()
+        for post_id in ids:
+            plist._append(post_id)
+        return plist
+
+    def _append(self, post_id):
+        if self._count % self.BLOCK == 0:
+            self._heads.append(post_id)
+            self._offsets.append(len(self._data))
+        else:
+            delta = post_id - self._last
+            data = self._data
+            while delta >= 0x80:
+                data.append(delta & 0x7f | 0x80)
+                delta >>= 7
+            data.append(delta)
+        self._count += 1
+        self._last = post_id
+
+    def add(self, post_id):
+        """ID を加え、新しく加わったら True を返す"""
+        if post_id > self._last:
+            self._append(post_id)
+            return True
+        if post_id in self:
+            return False
+        ids = list(self)
+        ids.insert(bisect_left(ids, post_id), post_id)
+        self.__init__()
+        for i in ids:
+            self._append(i)
+        return True
+
+    def update(self, ids):
+        """ID をまとめて加え、新しく加わった数を返す（途中への追加があっても作り直しは1回）"""
+        new = sorted(set(ids))
+        if not new:
+            return 0
+        before = self._count
+        if new[0] > self._last:
+            for post_id in new:
+                self._append(post_id)
+            return self._count - before
+        merged = list(merge(self, new))
+        self.__init__()
+        for post_id in merged:
+            if post_id != self._last:
+                self._append(post_id)
+        return self._count - before
+
+    def _block(self, block):
+        """ブロックを展開して値のリストを返す"""
+        data = self._data
+        pos = self._offsets[block]
+        end = self._offsets[block + 1] if block + 1 < len(self._offsets) else len(data)
+        value = self._heads[block]
+        values = [value]
+        delta = shift = 0
+        while pos < end:
+            byte = data[pos]
+            pos += 1
+            delta |= (byte & 0x7f) << shift
+            if byte & 0x80:
+                shift += 7
+            else:
+                value += delta
+                values.append(value)
+                delta = shift = 0
+        return values
+
+    def __iter__(self):
+        for block in range(len(self._heads)):
+            yield from self._block(block)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, post_id):
+        block = bisect_right(self._heads, post_id) - 1
+        if block < 0:
+            return False
+        values = self._block(block)
+        i = bisect_left(values, post_id)
+        return i < len(values) and values[i] == post_id
+
+    # to_bytes の先頭: 件数, 最後の値（空なら -1。u32 の ID が全部入るよう i64）, ブロック数, 差分列のバイト数
+    _HEADER = struct.Struct("<IqII")
+
+    def to_bytes(self):
+        """スナップショットに書くためのバイト列にする（from_bytes で戻せる）"""
+        return b"".join((
+            self._HEADER.pack(self._count, self._last, len(self._heads), len(self._data)),
+            self._heads.tobytes(), self._offsets.tobytes(), self._data,
+        ))
+
+    @classmethod
+    def from_bytes(cls, buf):
+        """to_bytes の結果（mmap のスライスでもよい）から作る。展開はしないのでコピーだけで済む"""
+        plist = cls()
+        plist._count, plist._last, blocks, size = cls._HEADER.unpack_from(buf)
+        pos = cls._HEADER.size
+        plist._heads.frombytes(buf[pos:pos + 4 * blocks])
+        pos += 4 * blocks
+        plist._offsets.frombytes(buf[pos:pos + 8 * blocks])
+        pos += 8 * blocks
+        plist._data[:] = buf[pos:pos + size]
+        return plist
+
+    def nbytes(self):
+        """圧縮後のおおよそのバイト数"""
+        return (len(self._data) + self._heads.itemsize * len(self._heads)
+                + self._offsets.itemsize * len(self._offsets))
+
+    def cursor(self):
+        return _PostingCursor(self)
+
+
+class _PostingCursor:
+    """PostingList を昇順にたどるカーソル。value が None なら終端
+
+    seek は skip 用のブロック先頭を指数探索（galloping）してから二分探索するので、
+    飛ばしたブロックは展開しない。
+    """
+
+    __slots__ = ("_list", "_block", "_values", "_i", "value")
+
+    def __init__(self, plist):
+        self._list = plist
+        self._block = -1
+        self._values = []
+        self._i = 0
+        self.value = None
+        if len(plist):
+            self._load(0)
+
+    def _load(self, block):
+        self._block = block
+        self._values = self._list._block(block)
+        self._i = 0
+        self.value = self._values[0]
+
+    def next(self):
+        self._i += 1
+        if self._i < len(self._values):
+            self.value = self._values[self._i]
+        elif self._block + 1 < len(self._list._heads):
+            self._load(self._block + 1)
+        else:
+            self.value = None
+
+    def seek(self, target):
+        """target 以上の最初の値まで進める"""
+        if self.value is None or self.value >= target:
+            return
+        heads = self._list._heads
+        n_blocks = len(heads)
+        block = self._block
+        if block + 1 < n_blocks and heads[block + 1] <= target:
+            # 後ろのブロック先頭を 1, 2, 4, ... 個先と調べて範囲を絞る
+            lo, step = block + 1, 1
+            hi = lo + step
+            while hi < n_blocks and heads[hi] <= target:
+                lo = hi
+                step *= 2
+                hi = lo + step
+            self._load(bisect_right(heads, target, lo, min(hi, n_blocks)) - 1)
+        values = self._values
+        i = bisect_left(values, target, self._i)
+        if i < len(values):
+            self._i = i
+            self.value = values[i]
+        elif self._block + 1 < n_blocks:
+            self._load(self._block + 1)
+        else:
+            self.value = None
+
+
+def intersect_postings(include, exclude=(), start=0):
+    """include の全てに含まれ、exclude のどれにも含まれない ID を昇順に1つずつ返す
+
+    一番短いリストを基準にし、他のリストは基準の値まで seek するだけなので、
+    長いリストのほとんどのブロックは展開しない。start 未満の ID は飛ばす。
+
+    >>> a = PostingList.from_sorted(range(0, 100, 2))
+    >>> b = PostingList.from_sorted(range(0, 100, 3))
+    >>> c = PostingList.from_sorted(range(0, 100, 4))
+    >>> list(intersect_postings([a, b], [c], start=10))
+    [18, 30, 42, 54, 66, 78, 90]
+    """
+    if not include:
+        return
+    cursors = sorted((plist.cursor() for plist in include), key=lambda c: len(c._list))
+    driver, others = cursors[0], cursors[1:]
+    excluded = [plist.cursor() for plist in exclude]
+    driver.seek(start)
+    while driver.value is not None:
+        candidate = driver.value
+        for c in others:
+            c.seek(candidate)
+            if c.value is None:
+                return
+            if c.value != candidate:
+                # 他のリストの次の値までは共通の ID が無いので、基準をそこまで進める
+                driver.seek(c.value)
+                break
+        else:
+            for c in excluded:
+                c.seek(candidate)
+            if all(c.value != candidate for c in excluded):
+                yield candidate
+            driver.next()
+
+
+# 検索式の1語: 'tag:' の接頭辞（省略可）と、"..." で囲んだタグか空白を含まない語
+_TAG_TOKEN_RE = re.compile(r'(tag:)?(?:"([^"]*)"|(\S+))')
+# これを含まない入力は検索式ではなく、入力全体を1つのタグとして扱う
+_TAG_QUERY_RE = re.compile(r'"|(?:^|\s)(?:tag:|(?:AND|NOT)(?:\s|$))')
+
+
+def parse_tag_query(query):
+    """タグの検索式を (含むタグのリスト, 除くタグのリスト) に分ける
+
+    'tag:' の接頭辞は省略でき、AND は省略できる。空白を含むタグは "..." で囲む。
+    'tag:'・AND・NOT・"..." のどれも含まない入力は、空白やアポストロフィも
+    そのままに、入力全体を1つのタグとして扱う。
+
+    >>> parse_tag_query('tag:python AND tag:"web dev" AND NOT tag:draft')
+    (['python', 'web dev'], ['draft'])
+    >>> parse_tag_query('python')
+    (['python'], [])
+    >>> parse_tag_query("web dev"), parse_tag_query("rock'n'roll"), parse_tag_query("AND")
+    ((['web dev'], []), (["rock'n'roll"], []), (['AND'], []))
+    """
+    literal = query.strip()
+    if not _TAG_QUERY_RE.search(literal):
+        return [literal], []
+    include, exclude = [], []
+    negate = False
+    for prefix, quoted, word in _TAG_TOKEN_RE.findall(literal):
+        if not prefix and word in ("AND", "NOT"):
+            negate = negate or word == "NOT"
+            continue
+        (exclude if negate else include).append(word or quoted)
+        negate = False
+    if not include and not exclude:
+        # AND / NOT だけの入力はそういう名前のタグとみなす
+        return [literal], []
+    return include, exclude
+
+
+class PostLog:
+    """投稿を1件ずつ追記するログ（write-ahead log）
+
+    レコードは「長さ（4バイト）+ CRC32（4バイト）+ JSON（UTF-8）」で、
+    ファイルの末尾に追記するだけなので1件の投稿は O(1) の書き込みで済む。
+    fsync は sync_every 件ごと、または前回から sync_interval 秒たったときにまとめて行う。
+    書き込み途中で落ちて末尾のレコードが壊れていても、replay はそこで止まり、
+    壊れた部分は open 時に切り詰める。
+
+    >>> import tempfile
+    >>> tmp = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(tmp.name, "posts.wal")
+    >>> log = PostLog(path)
+    >>> log.append({"id": 1}); log.append({"id": 2}); log.close()
+    >>> with open(path, "ab") as f:     # 3件目を書いている途中で落ちた
+    ...     _ = f.write(PostLog._HEADER.pack(100, 0) + b'{"id"')
+    >>> list(PostLog.replay(path))
+    [{'id': 1}, {'id': 2}]
+    >>> log = PostLog(path)            # 壊れた末尾を切り詰めてから追記する
+    >>> log.records
+    2
+    >>> log.append({"id": 3}); log.close()
+    >>> list(PostLog.replay(path))
+    [{'id': 1}, {'id': 2}, {'id': 3}]
+    >>> tmp.cleanup()
+    """
+
+    _HEADER = struct.Struct("<II")
+
+    def __init__(self, path, sync_every=64, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        # 正しく読めた所までで切り詰めてから追記する
+        valid, self.records = self._scan(path)
+        self._file = open(path, "ab")
+        self._file.truncate(valid)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def _scan(cls, path):
+        """(正しく読めた所までのバイト数, レコード数) を返す"""
+        valid = count = 0
+        for valid, _ in cls._records(path):
+            count += 1
+        return valid, count
+
+    @classmethod
+    def _records(cls, path):
+        """(そのレコードの終わりの位置, レコード) を順に返す。壊れた所で止まる"""
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            header_size = cls._HEADER.size
+            end = 0
+            while True:
+                header = f.read(header_size)
+                if len(header) < header_size:
+                    return
+                length, crc = cls._HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                end += header_size + length
+                yield end, json.loads(payload)
+
+    @classmethod
+    def replay(cls, path):
+        """ログのレコード（辞書）を書かれた順に返す"""
+        for _, record in cls._records(path):
+            yield record
+
+    def append(self, record):
+        payload = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        self._file.write(self._HEADER.pack(len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self.records += 1
+        self._unsynced += 1
+        if (self._unsynced >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+
+    def sync(self):
+        """バッファを書き出して fsync する"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def reset(self):
+        """スナップショットに書き出した後で、ログを空にする"""
+        self._file.truncate(0)
+        self.sync()
+        self.records = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+# バイナリのスナップショット（save_snapshot で書き、load が mmap して読む）
+#   ヘッダ: マジック, 記事数, 次のID（u64）, タグ数, 以下の各部分の開始位置
+#   ID 表: 昇順の記事ID（u32）と、それぞれの記事レコードの位置（u64）
+#   記事レコード: 種別, タイトル・本文のバイト数, タグ数, タイトル, 本文, タグ番号（u32）
+#   全記事IDの PostingList
+#   文字列表: タグ名（名前順）の終わりの位置（u32）と、UTF-8 で連結した名前
+#   タグの転置リスト: タグごとの開始位置（u64）と、PostingList.to_bytes の連結
+_SNAPSHOT_MAGIC = b"BLOGSNP2"
+_MAX_POST_ID = 2**32 - 1    # ID 表と PostingList のブロック先頭（u32）に入る最大の ID
+_SNAPSHOT_HEADER = struct.Struct("<8sIQIQQQQQ")
+_POST_RECORD = struct.Struct("<BIII")
+
+
+class MappedPostStore(MutableMapping):
+    """バイナリのスナップショットを mmap し、記事を最初に取り出したときに復元するコンテナ
+
+    開くときはヘッダを読むだけなので、記事数によらず一定の時間で使い始められる。
+    復元した記事はキャッシュし、読み込んだ後の投稿は別の dict に持つ。
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, n_posts, self.next_id, self._n_tags, ids_at, offsets_at,
+         self._all_ids_at, self._strings_at, self._tags_at) = _SNAPSHOT_HEADER.unpack_from(self._map)
+        if magic != _SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} は対応していない形式のスナップショットです（{magic!r}）")
+        self._view = memoryview(self._map)
+        self._ids = self._view[ids_at:ids_at + 4 * n_posts].cast('I')
+        self._offsets = self._view[offsets_at:offsets_at + 8 * n_posts].cast('Q')
+        self._decoded = {}      # 復元済みの記事
+        self._added = {}        # 読み込んだ後に入れた記事
+        self._deleted = set()   # スナップショットにあるが消した（上書きした）ID
+
+    def close(self):
+        for view in ("_offsets", "_ids", "_view"):
+            if hasattr(self, view):
+                getattr(self, view).release()
+                setattr(self, view, ())
+        self._map.close()
+        self._file.close()
+
+    def _row(self, post_id):
+        row = bisect_left(self._ids, post_id)
+        if row < len(self._ids) and self._ids[row] == post_id and post_id not in self._deleted:
+            return row
+        return None
+
+    def _decode(self, row):
+        m = self._map
+        pos = self._offsets[row]
+        type_code, title_len, body_len, n_tags = _POST_RECORD.unpack_from(m, pos)
+        pos += _POST_RECORD.size
+        title = m[pos:pos + title_len].decode('utf-8')
+        pos += title_len
+        body = m[pos:pos + body_len].decode('utf-8')
+        pos += body_len
+        tags = {self.tag_name(code) for code in array('I', m[pos:pos + 4 * n_tags])}
+        return _make_post(self._ids[row], title, body, tags, _TYPE_NAMES[type_code])
+
+    # -------- タグ --------
+    def tag_name(self, code):
+        start, end = struct.unpack_from("<II", self._map, self._strings_at + 4 * code)
+        names_at = self._strings_at + 4 * (self._n_tags + 1)
+        return self._map[names_at + start:names_at + end].decode('utf-8')
+
+    def find_tag(self, tag):
+        """タグ番号を二分探索で返す。無ければ None"""
+        lo, hi = 0, self._n_tags
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.tag_name(mid) < tag:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n_tags and self.tag_name(lo) == tag:
+            return lo
+        return None
+
+    def tag_postings(self, code):
+        start, end = struct.unpack_from("<QQ", self._map, self._tags_at + 8 * code)
+        return PostingList.from_bytes(self._map[start:end])
+
+    def stream(self):
+        """全記事を ID 順に復元して返す。キャッシュしないので、メモリは記事1件分で済む"""
+        for post_id in self:
+            post = self._added.get(post_id, self._decoded.get(post_id))
+            if post is None:
+                post = self._decode(bisect_left(self._ids, post_id))
+            yield post
+
+    def tag_count(self):
+        return self._n_tags
+
+    def all_ids(self):
+        return PostingList.from_bytes(self._map[self._all_ids_at:self._strings_at])
+
+    # -------- MutableMapping --------
+    def __getitem__(self, post_id):
+        post = self._added.get(post_id)
+        if post is not None:
+            return post
+        post = self._decoded.get(post_id)
+        if post is None:
+            row = self._row(post_id)
+            if row is None:
+                raise KeyError(post_id)
+            post = self._decoded[post_id] = self._decode(row)
+        return post
+
+    def __setitem__(self, post_id, post):
+        if self._row(post_id) is not None:
+            self._deleted.add(post_id)
+            self._decoded.pop(post_id, None)
+        self._added[post_id] = post
+
+    def __delitem__(self, post_id):
+        if post_id in self._added:
+            del self._added[post_id]
+        elif self._row(post_id) is not None:
+            self._deleted.add(post_id)
+            self._decoded.pop(post_id, None)
+        else:
+            raise KeyError(post_id)
+
+    def __iter__(self):
+        deleted = self._deleted
+        for post_id in self._ids:
+            if post_id not in deleted:
+                yield post_id
+        yield from self._added
+
+    def __len__(self):
+        return len(self._ids) - len(self._deleted) + len(self._added)
+
+    def __contains__(self, post_id):
+        return post_id in self._added or self._row(post_id) is not None
+
+    def clear(self):
+        self.close()
+        self._decoded.clear()
+        self._added.clear()
+        self._deleted.clear()
+
+
+class MappedTagIndex(defaultdict):
+    """MappedPostStore のタグの転置リストを、タグごとに最初に使ったときに読み込む _tag_index
+
+    読み込みロックの下で複数のスレッドから使われ、そのうち1つが _load_all で _store を
+    None にすることがある。_store は各メソッドで一度だけローカルに読んでから使う。
+    """
+
+    def __init__(self, store):
+        super().__init__(PostingList)
+        self._store = store
+
+    def _load(self, tag):
+        store = self._store
+        if store is None:
+            return None
+        code = store.find_tag(tag)
+        return None if code is None else store.tag_postings(code)
+
+    def __missing__(self, tag):
+        plist = self._load(tag)
+        if plist is None:
+            plist = PostingList()
+        self[tag] = plist
+        return plist
+
+    def get(self, tag, default=None):
+        if tag in self:
+            return self[tag]
+        return default
+
+    def __contains__(self, tag):
+        if super().__contains__(tag):
+            return True
+        store = self._store
+        return store is not None and store.find_tag(tag) is not None
+
+    def _load_all(self):
+        store = self._store
+        if store is not None:
+            for code in range(store.tag_count()):
+                tag = store.tag_name(code)
+                if not super().__contains__(tag):
+                    self[tag] = store.tag_postings(code)
+            self._store = None
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def __len__(self):
+        self._load_all()
+        return super().__len__()
+
+    def clear(self):
+        super().clear()
+        self._store = None
+
+
+class RWLock:
+    """読み込み同士は同時に進め、書き込みは1つずつ（読み込みとも排他に）行うロック
+
+    書き込みを待っているスレッドがあれば新しい読み込みを待たせるので、
+    読み込みが続いても書き込みが待たされ続けることはない。
+    書き込み中のスレッドは read / write をそのまま取り直せる（post -> compact -> save など）。
+    読み込み中に write を取ったり、read を入れ子に取ったりはしないこと。
+
+    >>> import threading
+    >>> lock, order = RWLock(), []
+    >>> def writer():
+    ...     with lock.write():
+    ...         with lock.read():            # 書き込み中なら取り直せる
+    ...             order.append("write")
+    >>> def reader():
+    ...     with lock.read():
+    ...         order.append("read")
+    >>> with lock.read():
+    ...     w = threading.Thread(target=writer); w.start()
+    ...     while not lock._waiting_writers:
+    ...         time.sleep(0.001)
+    ...     r = threading.Thread(target=reader); r.start()   # 書き込み待ちがあるので後回し
+    ...     order.append("first read")
+    >>> w.join(); r.join(); order
+    ['first read', 'write', 'read']
+    """
+
     def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writer = None           # 書き込み中のスレッドの識別子
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    def _enter_as_writer(self):
+        """呼び出したスレッドが書き込み中なら入れ子として数えて True を返す"""
+        if self._writer == get_ident():
+            self._writer_depth += 1
+            return True
+        return False
+
+    @contextlib.contextmanager
+    def read(self):
+        with self._cond:
+            nested = self._enter_as_writer()
+            if not nested:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                if nested:
+                    self._writer_depth -= 1
+                else:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        with self._cond:
+            if not self._enter_as_writer():
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = get_ident()
+                self._writer_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
+def _reading(method):
+    """メソッドを self._lock の読み込みロックの中で実行する"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _writing(method):
+    """メソッドを self._lock の書き込みロックの中で実行する"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _persisting(method):
+    """メソッドを読み込みロックと self._persist_lock の中で実行する
+
+    保存・書き出しは投稿とは排他にしつつ、保存同士は1つずつ行う
+    （同じファイルの置き換えやログを空にする処理が重ならないように）。
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.read(), self._persist_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+@contextlib.contextmanager
+def _replacing(path):
+    """path と同じディレクトリに作った一意な一時ファイルの名前を渡し、抜けるときに path と置き換える
+
+    例外で抜けたときは一時ファイルを消し、path はそのまま残す。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        yield tmp_name
+        os.replace(tmp_name, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_name)
+        raise
+
+
+def _open_text(path, mode, compress=None):
+    """テキストとして開く。compress を省くと、パスが .gz で終わるときだけ gzip で圧縮する"""
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _read_jsonl(path):
+    """JSON Lines のファイルを1行ずつ辞書にして返す（空行は飛ばし、JSON として読めない行は None）"""
+    with _open_text(path, "r") as f:
+        for line in f:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+
+def _valid_post_id(post_id):
+    """ID がスナップショットに保存できる範囲の整数なら True"""
+    return type(post_id) is int and 0 < post_id <= _MAX_POST_ID
+
+
+def _valid_record(record):
+    """JSON Lines の1行が記事として取り込める形（export_jsonl の書く形）なら True
+
+    >>> _valid_record({"id": 1, "title": "t", "body": "b", "tags": ["x"], "content_type": "memo"})
+    True
+    >>> _valid_record({"id": 1, "title": "t", "body": "b", "tags": ["x"]}), _valid_record(None)
+    (False, False)
+    >>> [_valid_record({"id": i, "title": "t", "body": "b", "tags": [], "content_type": "memo"})
+    ...  for i in (0, 3_000_000_000, 2**32)]
+    [False, True, False]
+    """
+    if not isinstance(record, dict):
+        return False
+    post_id, tags, content_type = record.get("id"), record.get("tags"), record.get("content_type")
+    return (_valid_post_id(post_id)
+            and isinstance(record.get("title"), str) and isinstance(record.get("body"), str)
+            and isinstance(tags, list) and all(isinstance(tag, str) for tag in tags)
+            and isinstance(content_type, str) and content_type in _TYPE_CODES)
+
+
+class BlogSystem:
+    def __init__(self, storage="dict"):
         # {id: BlogPost_object} という形式で記事を保存
-        self._posts = {}
-        # {tag_name: {id1, id2, ...}} という形式
-        self._tag_index = defaultdict(set)
+        # storage="columnar" なら、同じ形で使える列指向のコンテナに保存する
+        # （バイナリのスナップショットを load すると MappedPostStore に置き換わる）
+        if storage not in ("dict", "columnar"):
+            raise ValueError(f"unknown storage: {storage!r}")
+        self._storage = storage
+        self._posts = self._new_store()
+        # {tag_name: PostingList([id1, id2, ...])} という形式（IDは昇順に圧縮して持つ）
+        self._tag_index = defaultdict(PostingList)
+        # 全記事のID（NOT だけの検索式で使う）
+        self._all_ids = PostingList()
+        # タイトルと本文の全文検索インデックス（最初の全文検索のときに作り、
+        # それ以降は投稿のたびに加える。検索しなければメモリを使わない）
+        self._text_index = FullTextIndex()
+        self._text_index_stale = True
         # 次に割り振るID
         self._next_id = 1
+        # open_log で開いた追記ログ（無ければ save するまでメモリ上だけ）
+        self._log = None
+        self._snapshot = None
+        self._snapshot_binary = False
+        self._compact_every = 0
+        # 読み込み（view / 検索 / 保存）同士は同時に、投稿や読み込み直しは1つずつ行う
+        self._lock = RWLock()
+        # 保存・書き出し同士は1つずつ行う（読み込みロックの中で取る）
+        self._persist_lock = Lock()
+
+    def _new_store(self):
+        return {} if self._storage == "dict" else ColumnarPostStore()
 
+    @_writing
     def post(self, title, body, tags, content_type):
         """新しい記事またはメモを投稿する"""
+        if content_type not in _TYPE_CODES:
+            print(f"エラー: 不明なコンテンツタイプ '{content_type}' です。")
+            return None
         post_id = self._next_id
         tags_set = set(tags)
-        
-        new_post = None
+        # ログが開いていれば、メモリ上に反映する前に追記する
+        if self._log is not None:
+            self._log.append({"id": post_id, "title": title, "body": body,
+                              "tags": list(tags_set), "content_type": content_type})
+        new_post = self._apply_post(post_id, title, body, tags_set, content_type)
+        print(f"記事ID: {post_id} として投稿しました。")
+        if self._log is not None and self._log.records >= self._compact_every:
+            self.compact()
+        return new_post
+
+    def _apply_post(self, post_id, title, body, tags_set, content_type):
+        """記事をコンテナとインデックスに加える（post とログの再生で共通）"""
         # content_typeに応じて、適切なクラスのインスタンスを生成
-        if content_type == "article":
-            new_post = Article(id=post_id, title=title, content=body, tags=tags_set, content_type=content_type)
-        elif content_type == "memo":
-            new_post = Memo(id=post_id, title=title, memo_body=body, tags=tags_set, content_type=content_type)
-        else:
-            print(f"エラー: 不明なコンテンツタイプ '{content_type}' です。")
-            return None
+        new_post = _make_post(post_id, title, body, tags_set, content_type)
 
         self._posts[post_id] = new_post
         
         # 逆引きインデックスを更新
         for tag in tags_set:
             self._tag_index[tag].add(post_id)
+        self._all_ids.add(post_id)
+        if not self._text_index_stale:
+            self._text_index.add(post_id, title, body)
             
-        self._next_id += 1
-        print(f"記事ID: {post_id} として投稿しました。")
+        self._next_id = max(self._next_id, post_id + 1)
         return new_post
 
+    @_writing
+    def open_log(self, filename, sync_every=64, compact_every=10_000, binary=False):
+        """filename（スナップショット）と filename.wal（ログ）を読み込み、以降の投稿をログに追記する
+
+        compact_every 件たまるたびにスナップショットに書き出してログを空にする。
+        binary=True なら、スナップショットを save_snapshot のバイナリ形式で書く。
+
+        保存せずに落ちても、次に開いたときにログから投稿を復元する。
+
+        >>> import tempfile
+        >>> tmp = tempfile.TemporaryDirectory()
+        >>> path = os.path.join(tmp.name, "blog.json")
+        >>> blog = BlogSystem()
+        >>> blog.open_log(path, sync_every=1)  # doctest: +ELLIPSIS
+        情報: セーブファイル .../blog.json が見つかりませんでした。新しいファイルを作成します。
+        >>> _ = blog.post("WAL", "先に追記する", ["db"], "article")
+        記事ID: 1 として投稿しました。
+        >>> restored = BlogSystem()
+        >>> restored.open_log(path)  # doctest: +ELLIPSIS
+        情報: セーブファイル .../blog.json が見つかりませんでした。新しいファイルを作成します。
+        ログ .../blog.json.wal から 1 件の投稿を復元しました。
+        >>> restored.get(1).title, list(restored._tag_index["db"])
+        ('WAL', [1])
+        >>> blog.close(); restored.close(); tmp.cleanup()
+        """
+        self.close()
+        self.load(filename)
+        self._snapshot = filename
+        self._snapshot_binary = binary
+        self._compact_every = compact_every
+        self._log = PostLog(filename + ".wal", sync_every=sync_every)
+
+    def compact(self):
+        """今のデータをスナップショットに書き出し、ログを空にする"""
+        if self._log is None:
+            return
+        if self._snapshot_binary:
+            self.save_snapshot(self._snapshot)
+        else:
+            self.save(self._snapshot)
+
+    @_writing
+    def close(self):
+        """ログを fsync して閉じる"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    @_reading
     def list_all(self):
         """全ての記事のIDとタイトルを一覧表示する"""
         if not self._posts:
@@ -95,31 +1411,141 @@ class BlogSystem:
             print(f"ID: {post.id: <3} | Type: {post.content_type: <7} | Title: {post.title}")
         print("----------------\n")
 
+    @_reading
+    def get(self, post_id):
+        """IDで指定した記事/メモを返す。無ければ None"""
+        return self._posts.get(post_id)
+
     def view(self, post_id):
         """IDで指定した記事/メモの詳細を表示する"""
-        post = self._posts.get(post_id)
+        post = self.get(post_id)
         if post:
             # 各オブジェクトが持つdisplayメソッドを呼び出す（ポリモーフィズム）
             post.display()
         else:
             print(f"エラー: ID {post_id} の記事は見つかりませんでした。")
 
-    def search_by_tag(self, tag):
-        """タグで記事を検索する"""
-        print(f"\n--- タグ '{tag}' の検索結果 ---")
-        post_ids = self._tag_index.get(tag)
-        
-        if not post_ids:
+    def query_tags(self, query, page_size=20, after=0):
+        """タグの検索式に合う記事を、ID順に page_size 件ずつのリストで返すイテレータ
+
+        例: tag:python AND tag:web AND NOT tag:draft（'tag:' と AND は省略可）
+        after より大きいIDから始めるので、前のページの最後のIDを渡せば続きから読める。
+        呼び出した時点では何も計算せず、ページを取り出すたびに必要な分だけ交差を進める。
+        ページの間の投稿や取り込みは、前のページの最後のIDより後の分だけが結果に入る。
+
+        >>> blog = BlogSystem()
+        >>> record = {"title": "t", "body": "", "tags": ["x"], "content_type": "memo"}
+        >>> blog._import_batch([dict(record, id=i) for i in (2, 4, 6, 8)])
+        4
+        >>> pages = blog.query_tags("x", page_size=2)
+        >>> [p.id for p in next(pages)]
+        [2, 4]
+        >>> blog._import_batch([dict(record, id=i) for i in (1, 3, 5)])   # 転置リストが作り直される
+        3
+        >>> [[p.id for p in page] for page in pages]
+        [[5, 6], [8]]
+        """
+        include, exclude = parse_tag_query(query)
+        return self._pages(include, exclude, page_size, after)
+
+    def _pages(self, include, exclude, page_size, after):
+        while True:
+            # ページを作る間だけ読み込みロックを持つ（ページの間には投稿できる）。
+            # その間に転置リストが作り直されていてもよいよう、ページごとに前のページの
+            # 最後のIDの次から交差を取り直す
+            with self._lock.read():
+                lists = [self._tag_index.get(tag) for tag in include]
+                if any(plist is None for plist in lists):
+                    return
+                excluded = [self._tag_index[tag] for tag in exclude if tag in self._tag_index]
+                ids = intersect_postings(lists or [self._all_ids], excluded, start=after + 1)
+                page = [self._posts[post_id] for post_id in islice(ids, page_size)]
+            if not page:
+                return
+            yield page
+            after = page[-1].id
+
+    def search_by_tag(self, query, page_size=20):
+        """タグ（または検索式）で記事を検索し、最初のページを表示する
+
+        残りのページのイテレータを返す（show_page に渡すと次のページを表示する）。
+        """
+        print(f"\n--- タグ '{query}' の検索結果 ---")
+        pages = self.query_tags(query, page_size)
+        if not self.show_page(pages):
             print("このタグを持つ記事はありません。")
-            return
-        
-        for post_id in sorted(list(post_ids)): # ID順で表示されるようにソート
-            post = self._posts[post_id]
+        return pages
+
+    def show_page(self, pages):
+        """pages から次のページを取り出して表示し、表示した件数を返す"""
+        page = next(pages, None)
+        if not page:
+            return 0
+        for post in page:
             print(f"ID: {post.id: <3} | Type: {post.content_type: <7} | Title: {post.title}")
         print("---------------------------\n")
+        return len(page)
+
+    def search_text(self, query, k=10):
+        """タイトルと本文を全文検索し、スコアの高い順に表示して (ID, スコア) のリストを返す
+
+        例: python 入門 / python OR rust / "全文検索" python
+        """
+        print(f"\n--- '{query}' の検索結果 ---")
+        while True:
+            if self._text_index_stale:
+                self._ensure_text_index()
+            with self._lock.read():
+                # 索引を作ってから読み込みロックを取るまでに取り込みがあれば作り直す
+                if self._text_index_stale:
+                    continue
+                results = self._text_index.search(query, k=k)
+                posts = [self._posts[post_id] for post_id, _ in results]
+            break
+        if not results:
+            print("該当する記事はありません。")
+            return results
+        for post, (_, score) in zip(posts, results):
+            print(f"ID: {post.id: <3} | Score: {score:5.2f} | Type: {post.content_type: <7} | Title: {post.title}")
+        print("---------------------------\n")
+        return results
+
+    @_writing
+    def _ensure_text_index(self):
+        """最初の全文検索のとき（load や import の後も）、今ある記事から索引を作る"""
+        if self._text_index_stale:
+            self._text_index.clear()
+            for post_obj in self._posts.values():
+                self._text_index.add(post_obj.id, post_obj.title, _body_of(post_obj))
+            self._text_index_stale = False
 
+    @_persisting
     def save(self, filename):
-        """記事をファイルに保存する（修正版）"""
+        """記事をファイルに保存する（修正版）
+
+        複数のスレッドから同時に呼んでも、保存は1つずつ行われる。
+
+        >>> import tempfile, threading
+        >>> tmp = tempfile.TemporaryDirectory()
+        >>> path = os.path.join(tmp.name, "blog.json")
+        >>> blog, errors = BlogSystem(), []
+        >>> def save():
+        ...     try:
+        ...         blog.save(path)
+        ...     except OSError as e:
+        ...         errors.append(e)
+        >>> with contextlib.redirect_stdout(io.StringIO()):
+        ...     _ = blog.post("記事", "本文", ["python"], "article")
+        ...     threads = [threading.Thread(target=save) for _ in range(8)]
+        ...     for t in threads: t.start()
+        ...     for t in threads: t.join()
+        >>> errors, os.listdir(tmp.name)
+        ([], ['blog.json'])
+        >>> with open(path, encoding="utf-8") as f:
+        ...     json.load(f)["next_id"]
+        2
+        >>> tmp.cleanup()
+        """
 
         # 1. posts の中の BlogPost オブジェクトを、JSON互換の辞書に変換する
         posts_data = []
@@ -141,57 +1567,981 @@ class BlogSystem:
             "tag_index": tag_index_data
         }
     
-        # 4. ファイルに書き出す
-        with open(filename, 'w', encoding='utf-8') as f:
+        # 4. 一時ファイルに書き出してから置き換える（途中で落ちても元のファイルは壊れない）
+        with _replacing(filename) as tmp_name, open(tmp_name, 'w', encoding='utf-8') as f:
             json.dump(data_to_save, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        self._saved(filename)
     
         print(f"データを {filename} に保存しました。")
+
+    def _saved(self, filename):
+        # スナップショットに入ったので、ログは空にしてよい
+        if self._log is not None and filename == self._snapshot:
+            self._log.reset()
+
+    @_persisting
+    def save_snapshot(self, filename):
+        """記事をバイナリのスナップショットに保存する
+
+        load はこの形式を mmap して、記事を最初に取り出したときに復元するので、
+        起動時間は記事数によらない。
+
+        >>> import tempfile
+        >>> tmp = tempfile.TemporaryDirectory()
+        >>> path = os.path.join(tmp.name, "blog.snap")
+        >>> blog = BlogSystem()
+        >>> _ = blog.post("記事", "本文", ["python", "db"], "article")
+        記事ID: 1 として投稿しました。
+        >>> _ = blog.post("メモ", "覚え書き", ["python"], "memo")
+        記事ID: 2 として投稿しました。
+        >>> blog.save_snapshot(path)  # doctest: +ELLIPSIS
+        データを .../blog.snap に保存しました。
+        >>> loaded = BlogSystem()
+        >>> loaded.load(path)  # doctest: +ELLIPSIS
+        データを .../blog.snap から読み込みました。
+        >>> post = loaded.get(2)
+        >>> type(loaded._posts).__name__, post.content_type, post.memo_body, sorted(post.tags)
+        ('MappedPostStore', 'memo', '覚え書き', ['python'])
+        >>> [p.id for p in next(loaded.query_tags("python AND NOT db"))]
+        [2]
+        >>> _ = loaded.post("追加", "", ["db"], "memo")
+        記事ID: 3 として投稿しました。
+        >>> _ = loaded._apply_post(2**32 - 1, "大きいID", "", {"db"}, "memo")  # u32 の上限まで書ける
+        >>> loaded.save_snapshot(path)  # doctest: +ELLIPSIS
+        データを .../blog.snap に保存しました。
+        >>> again = BlogSystem()
+        >>> again.load(path)  # doctest: +ELLIPSIS
+        データを .../blog.snap から読み込みました。
+        >>> list(again._all_ids)[-2:], list(again._tag_index["db"]), again._next_id == 2**32
+        ([3, 4294967295], [1, 3, 4294967295], True)
+        >>> for b in (loaded, again):
+        ...     b.close(); b._posts.close()
+        >>> tmp.cleanup()
+        """
+        ids = sorted(self._posts)
+        tags = sorted(self._tag_index)
+        tag_codes = {tag: code for code, tag in enumerate(tags)}
+        with _replacing(filename) as tmp_name, open(tmp_name, 'wb') as f:
+            # ヘッダは位置が決まってから書き直す
+            f.write(bytes(_SNAPSHOT_HEADER.size))
+            ids_at = f.tell()
+            f.write(array('I', ids).tobytes())
+            f.write(bytes(-f.tell() % 8))
+            offsets_at = f.tell()
+            f.write(bytes(8 * len(ids)))
+            offsets = array('Q')
+            for post_id in ids:
+                post = self._posts[post_id]
+                title = post.title.encode('utf-8')
+                body = _body_of(post).encode('utf-8')
+                codes = array('I', sorted(tag_codes[tag] for tag in post.tags))
+                offsets.append(f.tell())
+                f.write(_POST_RECORD.pack(_TYPE_CODES[post.content_type], len(title), len(body), len(codes)))
+                f.write(title)
+                f.write(body)
+                f.write(codes.tobytes())
+            all_ids_at = f.tell()
+            f.write(PostingList.from_sorted(ids).to_bytes())
+            strings_at = f.tell()
+            names = [tag.encode('utf-8') for tag in tags]
+            ends = array('I', [0])
+            for name in names:
+                ends.append(ends[-1] + len(name))
+            f.write(ends.tobytes())
+            f.write(b"".join(names))
+            tags_at = f.tell()
+            starts = array('Q', [tags_at + 8 * (len(tags) + 1)])
+            f.seek(starts[0])
+            for tag in tags:
+                f.write(self._tag_index[tag].to_bytes())
+                starts.append(f.tell())
+            f.seek(tags_at)
+            f.write(starts.tobytes())
+            f.seek(offsets_at)
+            f.write(offsets.tobytes())
+            f.seek(0)
+            f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, len(ids), self._next_id, len(tags), ids_at,
+                                          offsets_at, all_ids_at, strings_at, tags_at))
+            f.flush()
+            os.fsync(f.fileno())
+        self._saved(filename)
+        print(f"データを {filename} に保存しました。")
     
-    def load(self, filename):
-        """ファイルからデータを読み込む"""
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            self._posts.clear() # 現在のデータをクリア
-
-            # 読み込んだ辞書から、正しい型のオブジェクトを復元する
-            for post_data in data['posts']:
-                content_type = post_data.get('content_type')
-                # JSONから読み込んだtags(list)をsetに変換
-                post_data['tags'] = set(post_data.get('tags', []))
-
-                post_obj = None
-                if content_type == 'article':
-                    post_obj = Article(**post_data)
-                elif content_type == 'memo':
-                    post_obj = Memo(**post_data)
-                
-                if post_obj:
-                    self._posts[post_obj.id] = post_obj
+    def _iter_posts(self):
+        """全記事を ID 順に返す（スナップショットから読んだ記事はキャッシュしない）"""
+        if isinstance(self._posts, MappedPostStore):
+            return self._posts.stream()
+        return (self._posts[post_id] for post_id in sorted(self._posts))
+
+    @_persisting
+    def export_jsonl(self, path):
+        """記事を1行に1件の JSON（JSON Lines）で書き出し、件数を返す
+
+        ID 順に1件ずつ書くので、記事全体の JSON をメモリに作らない。
+        path が .gz で終われば gzip で圧縮する。
+
+        >>> import tempfile
+        >>> tmp = tempfile.TemporaryDirectory()
+        >>> path = os.path.join(tmp.name, "posts.jsonl.gz")
+        >>> blog = BlogSystem()
+        >>> _ = blog.post("記事", "本文", ["python"], "article")
+        記事ID: 1 として投稿しました。
+        >>> blog.export_jsonl(path)  # doctest: +ELLIPSIS
+        1 件の記事を .../posts.jsonl.gz に書き出しました。
+        1
+        >>> other = BlogSystem()
+        >>> with contextlib.redirect_stdout(io.StringIO()):   # 2回目は同じ ID なので飛ばす
+        ...     counts = other.import_jsonl(path), other.import_jsonl(path)
+        >>> counts, other.get(1).content
+        (((1, 0), (0, 1)), '本文')
+        >>> tmp.cleanup()
+        """
+        count = 0
+        with _replacing(path) as tmp_name, _open_text(tmp_name, "w", compress=path.endswith(".gz")) as f:
+            for post in self._iter_posts():
+                record = {"id": post.id, "title": post.title, "body": _body_of(post),
+                          "tags": sorted(post.tags), "content_type": post.content_type}
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write("\n")
+                count += 1
+        print(f"{count} 件の記事を {path} に書き出しました。")
+        return count
+
+    def import_jsonl(self, path, batch_size=1000):
+        """export_jsonl で書いたファイルを1行ずつ読み、記事とインデックスに加える
+
+        同じ ID の記事が既にある行と、JSON として読めないか項目が欠けている・型が違う行は
+        飛ばす。ログが開いていれば batch_size 件ごとにログを fsync し、必要なら
+        スナップショットにまとめる。(取り込んだ件数, 飛ばした件数) を返す。
+        """
+        imported = skipped = 0
+        records = _read_jsonl(path)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            # バッチごとに書き込みロックを取り直すので、取り込み中も検索できる
+            added = self._import_batch(batch)
+            imported += added
+            skipped += len(batch) - added
+        print(f"{path} から {imported} 件の記事を取り込みました（{skipped} 件は ID の重複や不正な行のため飛ばしました）。")
+        return imported, skipped
+
+    @_writing
+    def _import_batch(self, batch):
+        """レコードのリストを記事とインデックスに加え、加えた件数を返す"""
+        # load と同じく、全文検索インデックスは最初の検索のときにまとめて作る
+        self._text_index.clear()
+        self._text_index_stale = True
+        # 転置リストへはバッチの最後にタグごとにまとめて加える（既存より小さい ID が
+        # 混ざっていても、作り直しはタグごとにバッチあたり1回で済む）
+        new_ids = defaultdict(list)
+        added = []
+        for record in batch:
+            if not _valid_record(record) or record["id"] in self._posts:
+                continue
+            if self._log is not None:
+                self._log.append(record)
+            post_id, tags = record["id"], set(record["tags"])
+            self._posts[post_id] = _make_post(post_id, record["title"], record["body"],
+                                              tags, record["content_type"])
+            for tag in tags:
+                new_ids[tag].append(post_id)
+            added.append(post_id)
+        for tag, ids in new_ids.items():
+            self._tag_index[tag].update(ids)
+        self._all_ids.update(added)
+        if added:
+            self._next_id = max(self._next_id, max(added) + 1)
+        if self._log is not None:
+            self._log.sync()
+            if self._log.records >= self._compact_every:
+                self.compact()
+        return len(added)
 
-            self._next_id = data['next_id']
+    def _load_json(self, filename):
+        """save で書いた JSON から全ての記事とタグの逆引きインデックスを復元する"""
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        # 今のデータを消す前に、ID が PostingList に入る範囲かを確かめる
+        loaded_tag_index = data.get('tag_index', {})
+        for post_id in chain((post_data.get('id') for post_data in data['posts']),
+                             chain.from_iterable(loaded_tag_index.values())):
+            if not _valid_post_id(post_id):
+                raise ValueError(f"記事ID {post_id!r} は扱える範囲（1〜{_MAX_POST_ID}）の整数ではありません")
+
+        self._posts.clear() # 現在のデータをクリア
+        self._posts = self._new_store()
+
+        # 読み込んだ辞書から、正しい型のオブジェクトを復元する
+        for post_data in data['posts']:
+            content_type = post_data.get('content_type')
+            # JSONから読み込んだtags(list)をsetに変換
+            post_data['tags'] = set(post_data.get('tags', []))
+
+            post_obj = None
+            if content_type == 'article':
+                post_obj = Article(**post_data)
+            elif content_type == 'memo':
+                post_obj = Memo(**post_data)
             
-            # JSONから読み込んだtag_indexのvalue(list)をsetに変換して復元
-            self._tag_index.clear()
-            loaded_tag_index = data.get('tag_index', {})
-            for tag, ids in loaded_tag_index.items():
-                self._tag_index[tag] = set(ids)
+            if post_obj:
+                self._posts[post_obj.id] = post_obj
+
+        self._next_id = data['next_id']
+
+        # JSONから読み込んだtag_indexのvalue(list)を昇順にして圧縮リストに復元
+        self._tag_index.clear()
+        self._tag_index = defaultdict(PostingList)
+        for tag, ids in loaded_tag_index.items():
+            self._tag_index[tag] = PostingList.from_sorted(sorted(set(ids)))
+        self._all_ids = PostingList.from_sorted(sorted(self._posts))
+
+    def _load_snapshot(self, filename):
+        """スナップショットを mmap する。記事とタグの転置リストは使うときに読む"""
+        store = MappedPostStore(filename)
+        self._posts.clear()
+        self._posts = store
+        self._tag_index.clear()
+        self._tag_index = MappedTagIndex(store)
+        self._all_ids = store.all_ids()
+        self._next_id = store.next_id
+
+    @_writing
+    def load(self, filename):
+        """ファイルからデータを読み込む（JSON とバイナリのスナップショットのどちらでもよい）
+
+        形式が正しくないファイルはエラーを表示するだけで、今のデータはそのまま残す。
+
+        >>> import tempfile
+        >>> tmp = tempfile.TemporaryDirectory()
+        >>> path = os.path.join(tmp.name, "big.json")
+        >>> post = {"id": 2**32, "title": "t", "content_type": "memo", "memo_body": "", "tags": []}
+        >>> with open(path, "w", encoding="utf-8") as f:
+        ...     json.dump({"posts": [post], "next_id": 2**32 + 1}, f)
+        >>> blog = BlogSystem()
+        >>> _ = blog.post("残る記事", "", [], "memo")
+        記事ID: 1 として投稿しました。
+        >>> blog.load(path)  # doctest: +ELLIPSIS
+        エラー: .../big.json のフォーマットが正しくないか、必要なデータがありません。 (記事ID 4294967296 は扱える範囲（1〜4294967295）の整数ではありません)
+        >>> sorted(blog._posts), list(blog._all_ids)
+        ([1], [1])
+        >>> tmp.cleanup()
+        """
+        try:
+            with open(filename, 'rb') as f:
+                # 版の違うスナップショットも MappedPostStore に渡し、形式のエラーとして報告する
+                is_snapshot = f.read(len(_SNAPSHOT_MAGIC)).startswith(_SNAPSHOT_MAGIC[:-1])
+            if is_snapshot:
+                self._load_snapshot(filename)
+            else:
+                self._load_json(filename)
+            # 全文検索インデックスは保存していないので、最初の検索のときに作り直す
+            self._text_index.clear()
+            self._text_index_stale = True
 
             print(f"データを {filename} から読み込みました。")
 
         except FileNotFoundError:
             print(f"情報: セーブファイル {filename} が見つかりませんでした。新しいファイルを作成します。")
-        except (json.JSONDecodeError, KeyError) as e:
+        except (ValueError, KeyError, struct.error) as e:
+            print(f"エラー: {filename} のフォーマットが正しくないか、必要なデータがありません。 ({e})")
+            return
+
+        # スナップショットの後に追記された投稿をログから再生する
+        # （書き出し直後に落ちた場合、スナップショットにある記事はもう一度は加えない）
+        if self._log is not None:
+            self._log.sync()
+        replayed = 0
+        for record in PostLog.replay(filename + ".wal"):
+            if record["id"] in self._posts:
+                continue
+            self._apply_post(record["id"], record["title"], record["body"],
+                             set(record["tags"]), record["content_type"])
+            replayed += 1
+        if replayed:
+            print(f"ログ {filename}.wal から {replayed} 件の投稿を復元しました。")
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    content_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS post_tags (
+    tag_id INTEGER NOT NULL,
+    post_id INTEGER NOT NULL,
+    PRIMARY KEY (tag_id, post_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS post_tags_by_post ON post_tags (post_id);
+"""
+# 本文は tokenize した語を空白でつないで入れる（日本語も2-gram で検索できるように）
+_SQLITE_FTS = "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(title, body, content='')"
+
+# SQL は定数にしておき、sqlite3 の文キャッシュでコンパイル済みの文を使い回す
+_SQL_INSERT_POST = "INSERT INTO posts (id, content_type, title, body) VALUES (?, ?, ?, ?)"
+_SQL_INSERT_TAG = "INSERT OR IGNORE INTO tags (name) VALUES (?)"
+_SQL_INSERT_POST_TAG = "INSERT OR IGNORE INTO post_tags (tag_id, post_id) SELECT id, ? FROM tags WHERE name = ?"
+_SQL_INSERT_FTS = "INSERT INTO posts_fts (rowid, title, body) VALUES (?, ?, ?)"
+_SQL_SELECT_POST = "SELECT id, content_type, title, body FROM posts WHERE id = ?"
+_SQL_SELECT_TAG_ID = "SELECT id FROM tags WHERE name = ?"
+
+
+class SqliteBlogSystem:
+    """BlogSystem と同じ使い方で、記事を SQLite（標準ライブラリの sqlite3）に保存する版
+
+    記事はファイルにあり、必要な行だけを読むので、メモリに入りきらない量でも扱え、
+    起動時に全件を読み込む必要もない。
+    - WAL モード（読み込みが書き込みを待たない）で開く
+    - タグは tags と post_tags（(tag_id, post_id) が主キー）の結合表で持ち、
+      タグの検索式は主キーの索引を ID 順にたどる問い合わせになる
+    - 全文検索は FTS5 の bm25 でランキングする（FTS5 が無い SQLite では LIKE で探す）
+    - まとめて投稿するときは post_many が executemany で1トランザクションに入れる
+
+    >>> system = SqliteBlogSystem(":memory:")
+    >>> _ = system.post("SQLite 入門", "全文検索の使い方", ["db", "python"], "article")
+    記事ID: 1 として投稿しました。
+    >>> _ = system.post("下書き", "まだ途中", ["db", "draft"], "memo")
+    記事ID: 2 として投稿しました。
+    >>> [p.id for p in next(system.query_tags("db AND NOT draft"))], system.get(2).memo_body
+    ([1], 'まだ途中')
+    >>> [post_id for post_id, _ in system.search_text("全文検索")]  # doctest: +ELLIPSIS
+    <BLANKLINE>
+    --- '全文検索' の検索結果 ---
+    ID: 1   | Score: ... | Type: article | Title: SQLite 入門
+    ---------------------------
+    <BLANKLINE>
+    [1]
+    >>> system.close()
+    """
+
+    def __init__(self, path="blog_data.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL では NORMAL でも、落ちたときに壊れるのは最後のトランザクションだけ
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SQLITE_SCHEMA)
+        try:
+            self._conn.execute(_SQLITE_FTS)
+            self._fts = True
+        except sqlite3.OperationalError:
+            self._fts = False
+        self._conn.commit()
+        self._next_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM posts").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    # -------- 書き込み --------
+    def post(self, title, body, tags, content_type):
+        """新しい記事またはメモを投稿する"""
+        if content_type not in _TYPE_CODES:
+            print(f"エラー: 不明なコンテンツタイプ '{content_type}' です。")
+            return None
+        post_id = self._next_id
+        with self._conn:
+            self._insert([(post_id, title, body, list(set(tags)), content_type)])
+        self._next_id += 1
+        print(f"記事ID: {post_id} として投稿しました。")
+        return _make_post(post_id, title, body, set(tags), content_type)
+
+    def post_many(self, items, batch_size=1000):
+        """(title, body, tags, content_type) の列を batch_size 件ずつまとめて投稿し、件数を返す"""
+        count = 0
+        records = ((title, body, tags, content_type) for title, body, tags, content_type in items
+                   if content_type in _TYPE_CODES)
+        while True:
+            batch = [(self._next_id + i, title, body, list(set(tags)), content_type)
+                     for i, (title, body, tags, content_type) in enumerate(islice(records, batch_size))]
+            if not batch:
+                return count
+            with self._conn:
+                self._insert(batch)
+            self._next_id += len(batch)
+            count += len(batch)
+
+    def _insert(self, rows):
+        """(id, title, body, tags, content_type) の行を現在のトランザクションに入れる"""
+        conn = self._conn
+        conn.executemany(_SQL_INSERT_POST, ((post_id, content_type, title, body)
+                                            for post_id, title, body, _, content_type in rows))
+        conn.executemany(_SQL_INSERT_TAG, ((tag,) for row in rows for tag in row[3]))
+        conn.executemany(_SQL_INSERT_POST_TAG, ((row[0], tag) for row in rows for tag in row[3]))
+        if self._fts:
+            conn.executemany(_SQL_INSERT_FTS, ((post_id, " ".join(tokenize(title)), " ".join(tokenize(body)))
+                                               for post_id, title, body, _, _ in rows))
+
+    # -------- 読み込み --------
+    def _posts_with_tags(self, rows):
+        """posts の行から、タグを1回の問い合わせでまとめて付けた記事のリストを作る"""
+        if not rows:
+            return []
+        tags = defaultdict(set)
+        placeholders = ",".join("?" * len(rows))
+        for post_id, name in self._conn.execute(
+                f"SELECT pt.post_id, t.name FROM post_tags pt JOIN tags t ON t.id = pt.tag_id "
+                f"WHERE pt.post_id IN ({placeholders})", [row[0] for row in rows]):
+            tags[post_id].add(name)
+        return [_make_post(post_id, title, body, tags[post_id], content_type)
+                for post_id, content_type, title, body in rows]
+
+    def get(self, post_id):
+        row = self._conn.execute(_SQL_SELECT_POST, (post_id,)).fetchone()
+        return self._posts_with_tags([row])[0] if row else None
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def list_all(self):
+        """全ての記事のIDとタイトルを一覧表示する（行を順に読むので全件をメモリに載せない）"""
+        rows = self._conn.execute("SELECT id, content_type, title FROM posts ORDER BY id")
+        first = rows.fetchone()
+        if first is None:
+            print("まだ記事がありません。")
+            return
+        print("\n--- 記事一覧 ---")
+        for post_id, content_type, title in chain((first,), rows):
+            print(f"ID: {post_id: <3} | Type: {content_type: <7} | Title: {title}")
+        print("----------------\n")
+
+    def view(self, post_id):
+        """IDで指定した記事/メモの詳細を表示する"""
+        post = self.get(post_id)
+        if post:
+            post.display()
+        else:
+            print(f"エラー: ID {post_id} の記事は見つかりませんでした。")
+
+    def query_tags(self, query, page_size=20, after=0):
+        """BlogSystem.query_tags と同じ検索式で、ID順に page_size 件ずつのページを返すイテレータ
+
+        一番記事の少ないタグの post_tags を ID 順にたどり、他のタグは EXISTS / NOT EXISTS で
+        主キーの索引を引く。ページごとに「前のページの最後のID より大きい」ものを
+        LIMIT 付きで問い合わせるので、1ページの手間は全体の件数によらない。
+        """
+        include, exclude = parse_tag_query(query)
+        tag_ids = {}
+        for tag in include + exclude:
+            row = self._conn.execute(_SQL_SELECT_TAG_ID, (tag,)).fetchone()
+            if row:
+                tag_ids[tag] = row[0]
+        if any(tag not in tag_ids for tag in include):
+            return iter(())
+        # 件数は上限までしか数えない（どれが一番少ないかが分かれば十分）
+        include_ids = sorted((tag_ids[tag] for tag in include), key=lambda tag_id: self._conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM post_tags WHERE tag_id = ? LIMIT 4096)", (tag_id,)).fetchone()[0])
+        exclude_ids = [tag_ids[tag] for tag in exclude if tag in tag_ids]
+        if include_ids:
+            sql = ("SELECT p.id, p.content_type, p.title, p.body FROM post_tags d "
+                   "JOIN posts p ON p.id = d.post_id WHERE d.tag_id = ? AND d.post_id > ?")
+            key = "d.post_id"
+        else:
+            sql = "SELECT p.id, p.content_type, p.title, p.body FROM posts p WHERE p.id > ?"
+            key = "p.id"
+        sql += f" AND EXISTS (SELECT 1 FROM post_tags WHERE tag_id = ? AND post_id = {key})" * len(include_ids[1:])
+        sql += f" AND NOT EXISTS (SELECT 1 FROM post_tags WHERE tag_id = ? AND post_id = {key})" * len(exclude_ids)
+        sql += f" ORDER BY {key} LIMIT ?"
+        return self._tag_pages(sql, include_ids, exclude_ids, page_size, after)
+
+    def _tag_pages(self, sql, include_ids, exclude_ids, page_size, after):
+        while True:
+            params = include_ids[:1] + [after] + include_ids[1:] + exclude_ids + [page_size]
+            rows = self._conn.execute(sql, params).fetchall()
+            if not rows:
+                return
+            yield self._posts_with_tags(rows)
+            after = rows[-1][0]
+
+    def search_by_tag(self, query, page_size=20):
+        """タグ（または検索式）で記事を検索し、最初のページを表示して残りのページを返す"""
+        print(f"\n--- タグ '{query}' の検索結果 ---")
+        pages = self.query_tags(query, page_size)
+        if not self.show_page(pages):
+            print("このタグを持つ記事はありません。")
+        return pages
+
+    show_page = BlogSystem.show_page
+
+    def search_text(self, query, k=10):
+        """タイトルと本文を全文検索し、スコアの高い順に表示して (ID, スコア) のリストを返す"""
+        print(f"\n--- '{query}' の検索結果 ---")
+        terms, phrases, mode = parse_text_query(query)
+        if self._fts:
+            results = self._search_fts(terms, phrases, mode, k)
+        else:
+            results = self._search_like(terms + [t for p in phrases for t in p], mode, k)
+        if not results:
+            print("該当する記事はありません。")
+            return results
+        for post_id, score in results:
+            post_id, content_type, title, _ = self._conn.execute(_SQL_SELECT_POST, (post_id,)).fetchone()
+            print(f"ID: {post_id: <3} | Score: {score:5.2f} | Type: {content_type: <7} | Title: {title}")
+        print("---------------------------\n")
+        return results
+
+    def _search_fts(self, terms, phrases, mode, k):
+        # 語は1つずつ、フレーズは語を空白でつないで "..." で囲む（FTS5 のフレーズ）
+        words = [f'"{t}"' for t in terms]
+        required = [f'"{" ".join(p)}"' for p in phrases]
+        if mode == "or" and len(words) > 1:
+            words = ["(" + " OR ".join(words) + ")"]
+        match = " AND ".join(words + required)
+        if not match:
+            return []
+        # bm25() は小さいほど良いので、符号を反転してスコアにする
+        rows = self._conn.execute(
+            "SELECT rowid, -bm25(posts_fts) FROM posts_fts WHERE posts_fts MATCH ? "
+            "ORDER BY bm25(posts_fts) LIMIT ?", (match, k))
+        return [(post_id, score) for post_id, score in rows]
+
+    def _search_like(self, terms, mode, k):
+        if not terms:
+            return []
+        condition = "(title LIKE ? OR body LIKE ?)"
+        where = (" OR " if mode == "or" else " AND ").join([condition] * len(terms))
+        params = [f"%{t}%" for t in terms for _ in range(2)]
+        rows = self._conn.execute(f"SELECT id FROM posts WHERE {where} ORDER BY id LIMIT ?", params + [k])
+        return [(post_id, 0.0) for (post_id,) in rows]
+
+    # -------- 保存と読み込み --------
+    def save(self, filename=None):
+        """コミットして WAL をデータベースに書き戻す。filename を渡すとそこにバックアップする"""
+        self._conn.commit()
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if filename is not None and os.path.abspath(filename) != os.path.abspath(self.path):
+            backup = sqlite3.connect(filename)
+            try:
+                self._conn.backup(backup)
+            finally:
+                backup.close()
+        print(f"データを {filename or self.path} に保存しました。")
+
+    def load(self, filename):
+        """SQLite のデータベースなら中身で置き換え、BlogSystem.save の JSON なら記事を取り込む
+
+        JSON のときは今ある記事を消してから取り込む（1トランザクションなので、
+        途中で失敗したら元のまま）。
+
+        >>> import tempfile
+        >>> tmp = tempfile.TemporaryDirectory()
+        >>> path = os.path.join(tmp.name, "blog.json")
+        >>> blog = BlogSystem()
+        >>> _ = blog.post("保存した記事", "JSON から", ["json"], "article")
+        記事ID: 1 として投稿しました。
+        >>> blog.save(path)  # doctest: +ELLIPSIS
+        データを .../blog.json に保存しました。
+        >>> system = SqliteBlogSystem(":memory:")
+        >>> _ = system.post("前からある記事", "消える", ["old"], "memo")
+        記事ID: 1 として投稿しました。
+        >>> system.load(path)  # doctest: +ELLIPSIS
+        データを .../blog.json から読み込みました。
+        >>> system.get(1).title, [p.id for p in next(system.query_tags("json"))], list(system.query_tags("old"))
+        ('保存した記事', [1], [])
+        >>> with contextlib.redirect_stdout(io.StringIO()):
+        ...     hits = system.search_text("消える"), system.search_text("JSON")
+        >>> [[post_id for post_id, _ in h] for h in hits]
+        [[], [1]]
+        >>> system.close(); tmp.cleanup()
+        """
+        try:
+            with open(filename, 'rb') as f:
+                is_sqlite = f.read(16) == b"SQLite format 3\x00"
+            if is_sqlite:
+                if os.path.abspath(filename) != os.path.abspath(self.path):
+                    source = sqlite3.connect(filename)
+                    try:
+                        source.backup(self._conn)
+                    finally:
+                        source.close()
+            else:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                rows = ((p['id'], p['title'], p['content'] if p['content_type'] == "article" else p['memo_body'],
+                         p.get('tags', []), p['content_type'])
+                        for p in data['posts'] if p.get('content_type') in _TYPE_CODES)
+                # 消してから入れ直すまでを1トランザクションにし、途中で失敗したら元に戻す
+                with self._conn:
+                    for table in ("post_tags", "tags", "posts"):
+                        self._conn.execute(f"DELETE FROM {table}")
+                    if self._fts:
+                        # 内容を持たない FTS5 の表は DELETE できないので作り直す
+                        self._conn.execute("DROP TABLE posts_fts")
+                        self._conn.execute(_SQLITE_FTS)
+                    while True:
+                        batch = list(islice(rows, 1000))
+                        if not batch:
+                            break
+                        self._insert(batch)
+            self._next_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM posts").fetchone()[0]
+            print(f"データを {filename} から読み込みました。")
+        except FileNotFoundError:
+            print(f"情報: セーブファイル {filename} が見つかりませんでした。")
+        except (json.JSONDecodeError, KeyError, sqlite3.DatabaseError) as e:
             print(f"エラー: {filename} のフォーマットが正しくないか、必要なデータがありません。 ({e})")
 
-def main():
-    """メインの実行ループ"""
-    system = BlogSystem()
-    system.load("blog_data.json") # 起動時に自動ロード
+    def export_jsonl(self, path):
+        """BlogSystem.export_jsonl と同じ形式で、行を順に読みながら書き出す"""
+        count = 0
+        with _replacing(path) as tmp_name, _open_text(tmp_name, "w", compress=path.endswith(".gz")) as f:
+            rows = self._conn.execute("SELECT id, content_type, title, body FROM posts ORDER BY id")
+            while True:
+                page = rows.fetchmany(1000)
+                if not page:
+                    break
+                for post in self._posts_with_tags(page):
+                    record = {"id": post.id, "title": post.title, "body": _body_of(post),
+                              "tags": sorted(post.tags), "content_type": post.content_type}
+                    f.write(json.dumps(record, ensure_ascii=False))
+                    f.write("\n")
+                    count += 1
+        print(f"{count} 件の記事を {path} に書き出しました。")
+        return count
+
+    def import_jsonl(self, path, batch_size=1000):
+        """JSON Lines を batch_size 件ずつ1トランザクションで取り込み、(取り込んだ件数, 飛ばした件数) を返す"""
+        imported = skipped = 0
+        records = _read_jsonl(path)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            valid = [r for r in batch if _valid_record(r)]
+            existing = {post_id for (post_id,) in self._conn.execute(
+                f"SELECT id FROM posts WHERE id IN ({','.join('?' * len(valid))})",
+                [r["id"] for r in valid])} if valid else set()
+            rows = []
+            for r in valid:
+                # 同じバッチ内の重複も飛ばす
+                if r["id"] not in existing:
+                    existing.add(r["id"])
+                    rows.append((r["id"], r["title"], r["body"], r["tags"], r["content_type"]))
+            with self._conn:
+                self._insert(rows)
+            imported += len(rows)
+            skipped += len(batch) - len(rows)
+        self._next_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM posts").fetchone()[0]
+        print(f"{path} から {imported} 件の記事を取り込みました（{skipped} 件は ID の重複や不正な行のため飛ばしました）。")
+        return imported, skipped
+
+
+def benchmark_search(n=1_000_000, vocabulary=50_000, queries=None):
+    """n 件の記事（語の出現頻度が Zipf 分布に近い合成データ）を索引に入れ、
+    クエリごとの平均検索時間を表示する
+
+    語ごとの最初の検索（cold）は impact 順のリストを作るので語の出現記事数に比例し、
+    2回目以降（warm）は上位 k 件が確定するまでリストの先頭を読むだけになる。
+    after post は1件投稿した直後の検索で、リストは作り直さないので warm と同程度になる。
+    """
+    import random
+    from itertools import accumulate
+    rng = random.Random(0)
+    # choices に毎回 weights を渡すと累積和を作り直すので、先に累積しておく
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    index = FullTextIndex()
+    for i in range(n):
+        words = rng.choices(range(vocabulary), cum_weights=cum_weights, k=rng.randrange(5, 15))
+        index.add(i + 1, f"w{words[0]}", " ".join(f"w{w}" for w in words[1:]))
+    if queries is None:
+        queries = ("w500", "w50 w200", "w1000 OR w2000", '"w10 w20"', "w5")
+    next_id = n
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=10)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(10):
+            hits = index.search(query, k=10)
+        warm = (time.perf_counter() - start) / 10
+        next_id += 1
+        index.add(next_id, f"w{rng.randrange(vocabulary)}", query.replace('"', ''))
+        start = time.perf_counter()
+        index.search(query, k=10)
+        after_post = time.perf_counter() - start
+        print(f"{n=:,}  {query!r:<18} cold {cold * 1000:8.3f} ms  warm {warm * 1000:8.3f} ms"
+              f"  after post {after_post * 1000:8.3f} ms  hits[0]={hits[:1]}")
+
+
+def benchmark_tags(n=1_000_000, page_size=20):
+    """n 件分のタグの転置リストで、set と PostingList のメモリと検索時間を比べる
+
+    タグは出現率 50% / 10% / 1% / 0.1% の4種類。ID順に最初の1ページを取り出す時間と、
+    全件を数える時間を測る（set 版は毎回 sorted で全件を並べる）。
+    """
+    import random
+    rng = random.Random(0)
+    rates = {"half": 0.5, "tenth": 0.1, "rare": 0.01, "draft": 0.001}
+    sets = {tag: {i for i in range(1, n + 1) if rng.random() < rate} for tag, rate in rates.items()}
+    postings = {tag: PostingList.from_sorted(sorted(ids)) for tag, ids in sets.items()}
+    for tag in rates:
+        # set 側は要素の int オブジェクトの分も含める
+        set_bytes = sys.getsizeof(sets[tag]) + sum(map(sys.getsizeof, sets[tag]))
+        print(f"{tag:<6} {len(sets[tag]):>9,} ids   set: {set_bytes / 2**20:7.2f} MiB"
+              f"   PostingList: {postings[tag].nbytes() / 2**20:7.2f} MiB")
+
+    queries = ((["half", "tenth"], ["draft"]), (["half", "rare"], []), (["tenth", "rare"], ["draft"]))
+    for include, exclude in queries:
+        start = time.perf_counter()
+        ids = sorted(set.intersection(*(sets[t] for t in include)).difference(*(sets[t] for t in exclude)))
+        first_set = ids[:page_size]
+        t_set = time.perf_counter() - start
+        start = time.perf_counter()
+        first = list(islice(intersect_postings([postings[t] for t in include],
+                                               [postings[t] for t in exclude]), page_size))
+        t_page = time.perf_counter() - start
+        assert first == first_set
+        start = time.perf_counter()
+        total = sum(1 for _ in intersect_postings([postings[t] for t in include],
+                                                  [postings[t] for t in exclude]))
+        t_all = time.perf_counter() - start
+        assert total == len(ids)
+        query = " AND ".join(include + [f"NOT {t}" for t in exclude])
+        print(f"{query:<28} hits={total:>8,}   set+sorted: {t_set * 1000:8.2f} ms   "
+              f"first page: {t_page * 1000:6.3f} ms   all: {t_all * 1000:8.2f} ms")
+
+
+def benchmark_persistence(n=2_000, directory="."):
+    """1件投稿するたびに永続化する場合の、save（JSON 全体の書き直し）と追記ログの時間を比べる"""
+    snapshot = os.path.join(directory, "bench_blog.json")
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for mode in ("save", "log"):
+            for name in (snapshot, snapshot + ".wal"):
+                if os.path.exists(name):
+                    os.remove(name)
+            system = BlogSystem()
+            if mode == "log":
+                system.open_log(snapshot, compact_every=n + 1)
+            start = time.perf_counter()
+            for i in range(n):
+                system.post(f"タイトル {i}", f"本文 {i} " * 8, ["python", f"tag{i % 10}"], "article")
+                if mode == "save":
+                    system.save(snapshot)
+            system.close()
+            results[mode] = time.perf_counter() - start
+    for name in (snapshot, snapshot + ".wal"):
+        if os.path.exists(name):
+            os.remove(name)
+    print(f"{n=:,}  save every post: {results['save'] / n * 1000:.3f} ms/post   "
+          f"append to log: {results['log'] / n * 1000:.3f} ms/post")
+
+
+def benchmark_snapshot(n=200_000, directory="."):
+    """n 件を JSON とバイナリのスナップショットに保存し、load から最初の view までの時間を比べる"""
+    json_name = os.path.join(directory, "bench_blog.json")
+    snapshot_name = os.path.join(directory, "bench_blog.snap")
+    results = []
+    # 投稿・保存・表示のメッセージは捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        system = BlogSystem()
+        for i in range(n):
+            system.post(f"タイトル {i}", f"本文 {i} " * 8, ["python", f"tag{i % 100}"], "article")
+        system.save(json_name)
+        system.save_snapshot(snapshot_name)
+        for name in (json_name, snapshot_name):
+            start = time.perf_counter()
+            loaded = BlogSystem()
+            loaded.load(name)
+            t_load = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded.view(n // 2)
+            first_page = next(loaded.query_tags("python AND tag7"))
+            t_first = time.perf_counter() - start
+            loaded._posts.clear()
+            os.remove(name)
+            results.append((os.path.basename(name), t_load, t_first, len(first_page)))
+    for name, t_load, t_first, hits in results:
+        print(f"{name:<16} {n=:,}  load: {t_load * 1000:9.2f} ms   "
+              f"view + first tag page: {t_first * 1000:7.3f} ms   ({hits} posts)")
+
+
+def benchmark_jsonl(n=100_000, directory="."):
+    """n 件の save / load と export_jsonl / import_jsonl の時間と一時メモリを比べる
+
+    一時メモリは、処理中のピークから処理後も残る分（読み込んだ記事など）を引いたもの。
+    """
+    json_name = os.path.join(directory, "bench_blog.json")
+    jsonl_name = os.path.join(directory, "bench_blog.jsonl.gz")
+    with contextlib.redirect_stdout(io.StringIO()):
+        system = BlogSystem()
+        for i in range(n):
+            system.post(f"タイトル {i}", f"本文 {i} " * 8, ["python", f"tag{i % 100}"], "article")
+
+    def run(action):
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = action()
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            return elapsed, peak - current, result
+        finally:
+            tracemalloc.stop()
+
+    def loaded(method, name):
+        other = BlogSystem()
+        getattr(other, method)(name)
+        return other
+
+    rows = [
+        ("save", run(lambda: system.save(json_name))),
+        ("export_jsonl", run(lambda: system.export_jsonl(jsonl_name))),
+        ("load", run(lambda: loaded("load", json_name))),
+        ("import_jsonl", run(lambda: loaded("import_jsonl", jsonl_name))),
+    ]
+    for name in (json_name, jsonl_name):
+        os.remove(name)
+    for name, (elapsed, transient, _) in rows:
+        print(f"{name:<13} {n=:,}  {elapsed:7.2f} s   transient memory: {transient / 2**20:8.1f} MiB")
+
+
+def benchmark_sqlite(n=200_000, path="bench_blog.db"):
+    """SqliteBlogSystem に n 件をまとめて投稿し、開き直す時間と検索の時間を測る"""
+    for name in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(name):
+            os.remove(name)
+    system = SqliteBlogSystem(path)
+    items = ((f"タイトル {i}", f"本文 {i} python{i % 1000}", ["python", f"tag{i % 100}"], "article")
+             for i in range(n))
+    start = time.perf_counter()
+    system.post_many(items, batch_size=5_000)
+    t_insert = time.perf_counter() - start
+    system.close()
+
+    start = time.perf_counter()
+    system = SqliteBlogSystem(path)
+    t_open = time.perf_counter() - start
+    timings = []
+    for label, action in (
+        ("first tag page", lambda: next(system.query_tags("python AND tag7 AND NOT tag8"))),
+        ("full-text top 10", lambda: system._search_fts(["python7"], [], "and", 10)),
+        ("view", lambda: system.get(n // 2)),
+    ):
+        start = time.perf_counter()
+        action()
+        timings.append((label, time.perf_counter() - start))
+    system.close()
+    for name in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(name):
+            os.remove(name)
+    print(f"{n=:,}  post_many: {n / t_insert:,.0f} posts/s   open: {t_open * 1000:.2f} ms")
+    for label, elapsed in timings:
+        print(f"  {label:<17} {elapsed * 1000:8.3f} ms")
+
+
+def benchmark_threads(n=20_000, thread_counts=(1, 2, 4, 8), ops=40_000, write_ratio=0.05):
+    """複数スレッドから BlogSystem に読み込み（get とタグ検索の1ページ目）と投稿を混ぜて行い、
+    スレッド数ごとのスループットを表示する
+
+    ops 回の操作をスレッドで等分し、write_ratio の割合で post を行う。
+    終わった後、ID が重複・欠番なく振られ、タグの転置リストと記事が一致するか確かめる。
+    Python のコードは GIL で1つずつしか動かないので、スレッドを増やしても
+    スループットはほぼ一定（ロックで遅くならないこと、壊れないことを見る）。
+    """
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    from threading import Barrier
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        system = BlogSystem()
+        for i in range(n):
+            system.post(f"タイトル {i}", f"本文 {i}", ["python", f"tag{i % 100}"], "article")
+
+    def worker(seed, count, barrier):
+        rng = random.Random(seed)
+        reads = writes = 0
+        barrier.wait()
+        for _ in range(count):
+            if rng.random() < write_ratio:
+                system.post("stress", "本文", ["python", "stress"], "memo")
+                writes += 1
+            elif rng.random() < 0.5:
+                system.get(rng.randrange(1, n + 1))
+                reads += 1
+            else:
+                next(system.query_tags(f"python AND tag{rng.randrange(100)} AND NOT stress", 10), None)
+                reads += 1
+        return reads, writes
+
+    for threads in thread_counts:
+        barrier = Barrier(threads + 1)
+        per_thread = ops // threads
+        # 投稿のメッセージは捨てる（sys.stdout の差し替えは全スレッドに効く）
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(threads) as pool:
+            futures = [pool.submit(worker, seed, per_thread, barrier) for seed in range(threads)]
+            barrier.wait()
+            start = time.perf_counter()
+            counts = [f.result() for f in futures]
+            elapsed = time.perf_counter() - start
+        reads = sum(r for r, _ in counts)
+        writes = sum(w for _, w in counts)
+        print(f"threads={threads:<3} {(reads + writes) / elapsed:>10,.0f} ops/s   "
+              f"reads={reads:,} writes={writes:,}")
+
+    # 同時に投稿しても ID は 1, 2, ... と重複なく振られ、インデックスとも一致する
+    ids = sorted(system._posts)
+    assert ids == list(range(1, system._next_id))
+    assert list(system._tag_index["python"]) == ids
+    stress = [post_id for post_id in ids if "stress" in system._posts[post_id].tags]
+    assert list(system._tag_index["stress"]) == stress
+
+
+def measure_memory(n=100_000, storage="dict"):
+    """n 件投稿したときの記事コンテナのメモリを測り、1件あたりのバイト数を返す
+
+    タグの逆引きインデックスと、全文検索インデックス（最初の全文検索で作る）の分は
+    記事コンテナとは別に表示する。
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        system = BlogSystem(storage=storage)
+        # 投稿ごとのメッセージは捨てる
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(n):
+                system.post(f"タイトル {i}", f"本文 {i} " * 8, [f"tag{i % 100}", "python"],
+                            "article" if i % 2 else "memo")
+        total = tracemalloc.get_traced_memory()[0] - before
+        system._ensure_text_index()
+        text_index = tracemalloc.get_traced_memory()[0] - before - total
+        system._text_index = None
+        # タグの逆引きインデックスは両方で共通なので、記事コンテナだけの分も出す
+        system._tag_index = None
+        posts_only = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    print(f"{storage:<9} n={n:,}  posts: {posts_only / n:7.1f} B/post   "
+          f"with tag index: {total / n:7.1f} B/post   text index: {text_index / n:7.1f} B/post")
+    return posts_only / n
+
+
+def main(argv=None):
+    """メインの実行ループ（--sqlite [ファイル] で SQLite 版を使う）"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--sqlite"]:
+        # 記事はデータベースにあるので、起動時に読み込むものは無い
+        data_file = argv[1] if len(argv) > 1 else "blog_data.db"
+        system = SqliteBlogSystem(data_file)
+    else:
+        data_file = "blog_data.json"
+        system = BlogSystem()
+        # 起動時に自動ロードし、以降の投稿は blog_data.json.wal に追記する
+        system.open_log(data_file)
+    # 直前の search の残りのページ（more で続きを表示）
+    pages = iter(())
     
     print("\nミニブログへようこそ！")
-    print("コマンド: post_article, post_memo, list, view <ID>, search <tag>, save, load, quit")
+    print("コマンド: post_article, post_memo, list, view <ID>, search <タグ | tag:a AND NOT tag:b>, more, find <語>, "
+          "save, load, export <file.jsonl[.gz]>, import <file.jsonl[.gz]>, quit")
     
     while True:
         try:
@@ -226,22 +2576,46 @@ def main():
                     continue
                 system.view(int(args))
 
+            elif command == "find":
+                if not args:
+                    print("エラー: 検索する語を指定してください。(例: find python 入門)")
+                    continue
+                system.search_text(args)
+
             elif command == "search":
                 if not args:
                     print("エラー: 検索するタグを指定してください。(例: search Python)")
                     continue
-                system.search_by_tag(args)
+                pages = system.search_by_tag(args)
+
+            elif command == "more":
+                if not system.show_page(pages):
+                    print("これ以上の検索結果はありません。")
                 
             elif command == "save":
-                system.save("blog_data.json")
+                system.save(data_file)
             
             elif command == "load":
-                system.load("blog_data.json")
+                system.load(data_file)
+
+            elif command in ("export", "import"):
+                if not args:
+                    print(f"エラー: ファイル名を指定してください。(例: {command} posts.jsonl.gz)")
+                    continue
+                try:
+                    if command == "export":
+                        system.export_jsonl(args)
+                    else:
+                        system.import_jsonl(args)
+                except (OSError, EOFError, UnicodeDecodeError) as e:
+                    print(f"エラー: {args} を{'書き出せません' if command == 'export' else '読み込めません'}: {e}")
 
             elif command == "quit":
-                print("変更を保存しますか？ (yes/no)")
+                # 投稿はログに書いてあるので、保存しなくても次回の起動時に復元される
+                print("スナップショットに保存しますか？ (yes/no)")
                 if input("> ").lower().strip() == 'yes':
-                    system.save("blog_data.json")
+                    system.save(data_file)
+                system.close()
                 print("プログラムを終了します。")
                 break
             
@@ -251,6 +2625,7 @@ def main():
         except ValueError:
             print("エラー: IDには数値を入力してください。")
         except KeyboardInterrupt:
+            system.close()
             print("\nプログラムを終了します。")
             sys.exit()
 
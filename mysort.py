@@ -1,6 +1,15 @@
-from timeit import timeit
-from random import randrange
+import os
 import sys
+import tempfile
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from heapq import merge
+from itertools import chain, repeat
+from multiprocessing.shared_memory import SharedMemory
+from random import randrange
+from timeit import default_timer
+from typing import Callable, Iterable, Iterator
 #sys.setrecursionlimit(10**9)
 def selection_sort(arr: list[int]) -> list[int]:
     """
@@ -31,20 +40,511 @@ def quick_sort(arr: list[int]) -> list[int]:
 
     return quick_sort(left)+mid+quick_sort(right)
 
-def benchmark(n: int = 10000, repeat: int = 3) -> None:
-    """1 万件ランダム整数で平均実行時間を出力"""
-    setup = (
-        "from __main__ import selection_sort, quick_sort, randrange;"
-        f"data=[randrange({n}) for _ in range({n})]"
+# これ以下の長さの区間は挿入ソートで仕上げる
+_INSERTION_CUTOFF = 16
+# これ以上の長さの区間はピボットを ninther（3つの3点中央値の中央値）で選ぶ
+_NINTHER_THRESHOLD = 128
+
+def intro_sort(a: list[int]) -> None:
+    """
+    イントロソート（in-place・非再帰）。
+    3点中央値 / ninther のピボットで3分割し、短い区間は挿入ソート、
+    分割が深くなりすぎた区間はヒープソートに切り替えるので最悪でも O(n log n)。
+
+    >>> data = [3, 1, 4, 1, 5, 9, 2, 6]
+    >>> intro_sort(data)
+    >>> data
+    [1, 1, 2, 3, 4, 5, 6, 9]
+    >>> data = list(range(1000, 0, -1))
+    >>> intro_sort(data)
+    >>> data == sorted(data)
+    True
+    """
+    n=len(a)
+    if n<2:
+        return
+    # (lo, hi, 残りの分割深さ) の区間 [lo, hi) を積むスタック
+    stack=[(0, n, 2*n.bit_length())]
+    while stack:
+        lo, hi, depth = stack.pop()
+        while hi-lo>_INSERTION_CUTOFF:
+            if depth==0:
+                _heap_sort_range(a, lo, hi)
+                break
+            depth-=1
+            lt, gt = _partition3(a, lo, hi, _choose_pivot(a, lo, hi))
+            # 大きい側を積み、小さい側をこのまま処理するとスタックは O(log n) で済む
+            if lt-lo<hi-gt:
+                stack.append((gt, hi, depth))
+                hi=lt
+            else:
+                stack.append((lo, lt, depth))
+                lo=gt
+        else:
+            _insertion_sort(a, lo, hi)
+
+def _median3(a: list[int], i: int, j: int, k: int) -> int:
+    """a[i], a[j], a[k] の中央値のインデックスを返す"""
+    x, y, z = a[i], a[j], a[k]
+    if x<y:
+        if y<z:
+            return j
+        return k if x<z else i
+    if x<z:
+        return i
+    return k if y<z else j
+
+def _choose_pivot(a: list[int], lo: int, hi: int) -> int:
+    """区間 [lo, hi) のピボット値を選ぶ"""
+    mid=(lo+hi)//2
+    last=hi-1
+    if hi-lo<_NINTHER_THRESHOLD:
+        return a[_median3(a, lo, mid, last)]
+    step=(hi-lo)//8
+    return a[_median3(
+        a,
+        _median3(a, lo, lo+step, lo+2*step),
+        _median3(a, mid-step, mid, mid+step),
+        _median3(a, last-2*step, last-step, last),
+    )]
+
+def _partition3(a: list[int], lo: int, hi: int, pivot: int) -> tuple[int, int]:
+    """
+    区間 [lo, hi) を pivot 未満・等しい・より大きいの3つに分け、
+    等しい部分の範囲 [lt, gt) を返す（重複の多いデータでも深くならない）
+    """
+    lt, i, gt = lo, lo, hi-1
+    while i<=gt:
+        x=a[i]
+        if x<pivot:
+            a[lt], a[i] = x, a[lt]
+            lt+=1
+            i+=1
+        elif x>pivot:
+            a[i], a[gt] = a[gt], x
+            gt-=1
+        else:
+            i+=1
+    return lt, gt+1
+
+def _insertion_sort(a: list[int], lo: int, hi: int) -> None:
+    """区間 [lo, hi) を挿入ソートする"""
+    for i in range(lo+1, hi):
+        x=a[i]
+        j=i-1
+        while j>=lo and a[j]>x:
+            a[j+1]=a[j]
+            j-=1
+        a[j+1]=x
+
+def _heap_sort_range(a: list[int], lo: int, hi: int) -> None:
+    """区間 [lo, hi) をヒープソートする（イントロソートの最悪ケース対策）"""
+    n=hi-lo
+    for start in range(n//2-1, -1, -1):
+        _sift_down(a, lo, start, n)
+    for end in range(n-1, 0, -1):
+        a[lo], a[lo+end] = a[lo+end], a[lo]
+        _sift_down(a, lo, 0, end)
+
+def _sift_down(a: list[int], lo: int, root: int, size: int) -> None:
+    """a[lo:lo+size] を最大ヒープとみなして root から下へ沈める"""
+    x=a[lo+root]
+    child=2*root+1
+    while child<size:
+        if child+1<size and a[lo+child]<a[lo+child+1]:
+            child+=1
+        if a[lo+child]<=x:
+            break
+        a[lo+root]=a[lo+child]
+        root=child
+        child=2*root+1
+    a[lo+root]=x
+
+# 値の範囲（最大値 - 最小値 + 1）がデータ数のこの倍数以下なら計数ソートを使う
+_COUNTING_SPAN_FACTOR = 2
+# 基数ソートを使う最小件数と、範囲の上限（これを超えたら比較ソート）
+_RADIX_MIN_N = 256
+_RADIX_MAX_BITS = 64
+_INT_TYPECODES = frozenset('bBhHiIlLqQ')
+
+def counting_sort(data: Iterable[int]) -> list[int]:
+    """
+    計数ソート。値の範囲が狭い整数列向けで O(n + 範囲)。
+
+    >>> counting_sort([3, -1, 4, 1, 5, 1])
+    [-1, 1, 1, 3, 4, 5]
+    """
+    a=data if isinstance(data, (list, array, memoryview)) else list(data)
+    if len(a)<2:
+        return list(a)
+    lo=min(a)
+    counts=[0]*(max(a)-lo+1)
+    for x in a:
+        counts[x-lo]+=1
+    out=[]
+    for offset, c in enumerate(counts):
+        if c:
+            out.extend(repeat(lo+offset, c))
+    return out
+
+def radix_sort(data: Iterable[int]) -> list[int]:
+    """
+    LSD 基数ソート。最小値を引いて非負にしてから、下位の桁からバケットに振り分ける。
+    1桁は件数が少なければ 8bit、多ければ 11bit（バケットの作成コストとパス数の兼ね合い）。
+
+    >>> radix_sort([2**40, -5, 3, 2**33, -5, 0])
+    [-5, -5, 0, 3, 8589934592, 1099511627776]
+    """
+    a=data if isinstance(data, (list, array, memoryview)) else list(data)
+    if len(a)<2:
+        return list(a)
+    lo=min(a)
+    span=max(a)-lo
+    bits=8 if len(a)<2**14 else 11
+    mask=(1<<bits)-1
+    keys=[x-lo for x in a] if lo else list(a)
+    shift=0
+    while span>>shift:
+        buckets=[[] for _ in range(1<<bits)]
+        appends=[b.append for b in buckets]
+        for k in keys:
+            appends[(k>>shift)&mask](k)
+        keys=list(chain.from_iterable(buckets))
+        shift+=bits
+    return [k+lo for k in keys] if lo else keys
+
+def auto_sort(data: Iterable[int]) -> list[int]:
+    """
+    キーの種類と範囲を調べて、計数ソート・基数ソート・比較ソート（intro_sort）から選ぶ。
+
+    >>> auto_sort([3, 1, 2, 1])          # 範囲が狭い -> 計数ソート
+    [1, 1, 2, 3]
+    >>> auto_sort(array('q', [5, -2**40, 7]))
+    [-1099511627776, 5, 7]
+    >>> auto_sort([2.5, 1.0, 2.0])       # 整数でない -> 比較ソート
+    [1.0, 2.0, 2.5]
+    """
+    a=data if isinstance(data, (list, array, memoryview)) else list(data)
+    if len(a)<2:
+        return list(a)
+    sort=_choose_sort(a)
+    if sort is not intro_sort:
+        return sort(a)
+    out=list(a)
+    intro_sort(out)
+    return out
+
+def _choose_sort(a) -> Callable:
+    """
+    auto_sort が a に使うソート（counting_sort / radix_sort / intro_sort）を返す
+
+    >>> _choose_sort([3, 1, 2]).__name__, _choose_sort([0.5, 0.1]).__name__
+    ('counting_sort', 'intro_sort')
+    """
+    n=len(a)
+    if n and (_is_int_buffer(a) or all(type(x) is int for x in a)):
+        span=max(a)-min(a)+1
+        if span<=_COUNTING_SPAN_FACTOR*n:
+            return counting_sort
+        if n>=_RADIX_MIN_N and span.bit_length()<=_RADIX_MAX_BITS:
+            return radix_sort
+    return intro_sort
+
+def _is_int_buffer(a) -> bool:
+    if isinstance(a, array):
+        return a.typecode in _INT_TYPECODES
+    if isinstance(a, memoryview):
+        return a.format.lstrip('@=<>!') in _INT_TYPECODES
+    return False
+
+def benchmark_integer_sorts(sizes: Iterable[int] = (10**4, 10**5, 10**6)) -> None:
+    """整数キーの範囲別に auto_sort と quick_sort / sorted() を比べる"""
+    cases=(
+        ("randrange(n)", lambda n: randrange(n)),
+        ("32bit id", lambda n: randrange(2**32)),
+        ("64bit id", lambda n: randrange(-2**63, 2**63)),
     )
-    sel = timeit("selection_sort(data)", setup=setup, number=repeat) / repeat
-    qck = timeit("quick_sort(data)", setup=setup, number=repeat) / repeat
-    print(f"{n=}, {repeat=}")
-    print(f"selection_sort: {sel:.3f}s   quick_sort: {qck:.3f}s")
+    for n in sizes:
+        for label, gen in cases:
+            data=[gen(n) for _ in range(n)]
+            row=[]
+            for name, sort in (("auto_sort", auto_sort), ("quick_sort", quick_sort), ("sorted", sorted)):
+                start=default_timer()
+                sort(data)
+                row.append(f"{name}: {default_timer()-start:.3f}s")
+            print(f"{n=:<9,} {label:<13} " + "   ".join(row))
+
+# 外部ソートで1要素あたりに見積もるバイト数（array('q') の1要素）
+_ITEM_BYTES = array('q').itemsize
+# 入力テキストを一度に読むバイト数の上限と下限。分割したトークンのリストは
+# 読んだバイト数の十数倍になるので、memory_budget の 1/_READ_BLOCK_DIV に抑える
+_READ_BLOCK = 2**20
+_MIN_READ_BLOCK = 4096
+_READ_BLOCK_DIV = 16
+
+def external_sort(
+    src: str,
+    dst: str,
+    memory_budget: int = 64 * 2**20,
+    max_fanin: int = 64,
+    sorter: Callable[[array], None] = intro_sort,
+    tmpdir: str | None = None,
+) -> int:
+    """
+    メモリに載らない整数ファイルを外部マージソートし、並べた件数を返す。
+
+    src は空白・改行区切りの整数（64bit 符号付きに収まるもの）のテキスト。
+    memory_budget バイトに収まる件数ずつ array('q') に読み込んで sorter で
+    in-place ソートし、バイナリのまま一時ファイル（ラン）に書き出す。
+    最後にヒープを使った k-way マージで dst に1行1件で書き出す。
+    ランが max_fanin を超えるときは、先に max_fanin 本ずつ中間マージする。
+
+    >>> import os, tempfile
+    >>> d = tempfile.mkdtemp()
+    >>> src, dst = os.path.join(d, "in.txt"), os.path.join(d, "out.txt")
+    >>> with open(src, "w") as f:
+    ...     _ = f.write("5 3 9 -1 7 3 0 2")
+    >>> external_sort(src, dst, memory_budget=3 * 8)
+    8
+    >>> open(dst).read().split()
+    ['-1', '0', '2', '3', '3', '5', '7', '9']
+    """
+    chunk_items=max(1, memory_budget//_ITEM_BYTES)
+    with tempfile.TemporaryDirectory(dir=tmpdir) as work:
+        runs=[]
+        total=0
+        chunk=array('q')
+        with open(src, 'rb') as f:
+            for value in _read_ints(f, max(_MIN_READ_BLOCK, min(_READ_BLOCK, memory_budget//_READ_BLOCK_DIV))):
+                chunk.append(value)
+                if len(chunk)>=chunk_items:
+                    runs.append(_spill_run(chunk, sorter, work, len(runs)))
+                    total+=len(chunk)
+                    chunk=array('q')
+        if chunk or not runs:
+            runs.append(_spill_run(chunk, sorter, work, len(runs)))
+            total+=len(chunk)
+        # マージ中は (ラン数 + 出力) 本のバッファで予算を分け合う
+        fanin=max(2, min(max_fanin, chunk_items))
+        generation=0
+        while len(runs)>fanin:
+            merged=[]
+            block=max(1, chunk_items//(fanin+1))
+            for i in range(0, len(runs), fanin):
+                group=runs[i:i+fanin]
+                path=os.path.join(work, f"merge{generation}-{i}.bin")
+                with open(path, 'wb') as out:
+                    _write_binary(merge(*(_read_run(r, block) for r in group)), out, block)
+                for r in group:
+                    os.remove(r)
+                merged.append(path)
+            runs=merged
+            generation+=1
+        block=max(1, chunk_items//(len(runs)+1))
+        with open(dst, 'w') as out:
+            _write_text(merge(*(_read_run(r, block) for r in runs)), out, block)
+    return total
+
+def _read_ints(f, block: int) -> Iterator[int]:
+    """
+    ファイルを block バイトずつ読み、空白区切りの整数を1件ずつ返す。
+    改行がなくても一度に読むのは block バイトまでで、ブロック境界で切れた
+    数字は次のブロックの先頭とつなげる。
+
+    >>> import io
+    >>> list(_read_ints(io.BytesIO(b"12 -345  6 78"), 3))
+    [12, -345, 6, 78]
+    """
+    carry=b''
+    while True:
+        buf=f.read(block)
+        if not buf:
+            break
+        tokens=(carry+buf).split()
+        # 末尾が空白で終わっていなければ最後のトークンは途中かもしれない
+        carry=tokens.pop() if tokens and not buf[-1:].isspace() else b''
+        for token in tokens:
+            yield int(token)
+    if carry:
+        yield int(carry)
+
+def _spill_run(chunk: array, sorter: Callable[[array], None], work: str, index: int) -> str:
+    """チャンクをソートしてバイナリのランとして書き出し、そのパスを返す"""
+    sorter(chunk)
+    path=os.path.join(work, f"run{index}.bin")
+    with open(path, 'wb') as f:
+        chunk.tofile(f)
+    return path
+
+def _read_run(path: str, block: int) -> Iterator[int]:
+    """ランを block 件ずつ読みながら1件ずつ返す"""
+    with open(path, 'rb') as f:
+        while True:
+            buf=array('q')
+            try:
+                buf.fromfile(f, block)
+            except EOFError:
+                # 最後の端数は読めた分だけ buf に入っている
+                pass
+            if not buf:
+                return
+            yield from buf
+
+def _write_binary(values: Iterable[int], out, block: int) -> None:
+    buf=array('q')
+    for x in values:
+        buf.append(x)
+        if len(buf)>=block:
+            buf.tofile(out)
+            buf=array('q')
+    buf.tofile(out)
+
+def _write_text(values: Iterable[int], out, block: int) -> None:
+    buf=[]
+    for x in values:
+        buf.append(x)
+        if len(buf)>=block:
+            out.write("\n".join(map(str, buf))+"\n")
+            buf=[]
+    if buf:
+        out.write("\n".join(map(str, buf))+"\n")
+
+def benchmark_external(n: int = 4_000_000, memory_budget: int = 8 * 2**20) -> None:
+    """メモリ予算の数倍のデータ（既定: 約 32MB 分の整数を 8MB で）を外部ソートする"""
+    with tempfile.TemporaryDirectory() as d:
+        src=os.path.join(d, "input.txt")
+        dst=os.path.join(d, "output.txt")
+        with open(src, 'w') as f:
+            for i in range(0, n, 100_000):
+                f.write("\n".join(str(randrange(-2**62, 2**62)) for _ in range(min(100_000, n-i))) + "\n")
+        start=default_timer()
+        count=external_sort(src, dst, memory_budget=memory_budget)
+        elapsed=default_timer()-start
+        prev=None
+        with open(dst) as f:
+            for line in f:
+                x=int(line)
+                assert prev is None or prev<=x, "output is not sorted"
+                prev=x
+        ratio=count*_ITEM_BYTES/memory_budget
+        print(f"{count=:,} budget={memory_budget/2**20:.0f}MiB (data x{ratio:.1f})  "
+              f"external_sort: {elapsed:.2f}s  input={os.path.getsize(src)/2**20:.0f}MiB")
+
+# サンプルソートで分割値を選ぶときの、ワーカー1つあたりのサンプル数
+_OVERSAMPLE = 64
+
+def parallel_sort(data: Iterable[int], workers: int | None = None) -> list[int]:
+    """
+    複数プロセスでソートした新しいリストを返す（64bit 符号付き整数のみ）。
+
+    サンプルソート: 無作為に選んだ値から workers-1 個の分割値を決め、
+    1段目で各プロセスが共有メモリ上の連続区間をソートして分割値での切れ目を返す。
+    2段目でプロセス j が値の範囲 j に入る部分を全区間から集めてソートし、
+    出力用の共有メモリの自分の位置に書く。値の範囲は重ならないので、
+    親は出力をそのまま読むだけで、親でのマージは発生しない。
+    ワーカーには共有メモリの名前と区間だけを渡すので、リストの pickle も発生しない。
+
+    >>> parallel_sort([5, 3, 9, -1, 7, 3, 0, 2], workers=2)
+    [-1, 0, 2, 3, 3, 5, 7, 9]
+    >>> parallel_sort([4] * 5 + [1] * 5, workers=3)
+    [1, 1, 1, 1, 1, 4, 4, 4, 4, 4]
+    """
+    buf=array('q', data)
+    n=len(buf)
+    if workers is None:
+        workers=os.cpu_count() or 1
+    workers=max(1, min(workers, n))
+    if workers==1:
+        return sorted(buf)
+    sample=sorted(buf[randrange(n)] for _ in range(workers*_OVERSAMPLE))
+    splitters=[sample[j*_OVERSAMPLE] for j in range(1, workers)]
+    src=SharedMemory(create=True, size=n*_ITEM_BYTES)
+    try:
+        dst=SharedMemory(create=True, size=n*_ITEM_BYTES)
+        try:
+            view=src.buf.cast('q')
+            view[:]=buf
+            view.release()
+            del buf
+            bounds=[(i*n//workers, (i+1)*n//workers) for i in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                cuts=list(pool.map(_sort_and_cut, repeat(src.name), *zip(*bounds), repeat(splitters)))
+                # 値の範囲 j に入る部分は、各区間の cuts[j]..cuts[j+1]
+                pieces=[[(lo+c[j], lo+c[j+1]) for (lo, _), c in zip(bounds, cuts)]
+                        for j in range(workers)]
+                offsets=[0]
+                for ranges in pieces[:-1]:
+                    offsets.append(offsets[-1]+sum(hi-lo for lo, hi in ranges))
+                list(pool.map(_sort_bucket, repeat(src.name), repeat(dst.name), pieces, offsets))
+            view=dst.buf.cast('q')
+            result=view.tolist()
+            view.release()
+        finally:
+            dst.close()
+            dst.unlink()
+    finally:
+        src.close()
+        src.unlink()
+    return result
+
+def _sort_and_cut(name: str, lo: int, hi: int, splitters: list[int]) -> list[int]:
+    """ワーカー側（1段目）: 区間 [lo, hi) をソートして書き戻し、分割値での切れ目を返す"""
+    shm=SharedMemory(name=name)
+    try:
+        view=shm.buf.cast('q')
+        a=sorted(view[lo:hi])
+        view[lo:hi]=array('q', a)
+        view.release()
+    finally:
+        shm.close()
+    return [0, *(bisect_right(a, s) for s in splitters), len(a)]
+
+def _sort_bucket(src_name: str, dst_name: str, ranges: list[tuple[int, int]], offset: int) -> None:
+    """ワーカー側（2段目）: ソート済みの断片を集めてソートし、出力の offset から書く"""
+    src=SharedMemory(name=src_name)
+    try:
+        view=src.buf.cast('q')
+        a=array('q')
+        for lo, hi in ranges:
+            a.extend(view[lo:hi])
+        view.release()
+    finally:
+        src.close()
+    # 断片はそれぞれソート済みなので、timsort はランのマージだけで済む
+    a=sorted(a)
+    dst=SharedMemory(name=dst_name)
+    try:
+        view=dst.buf.cast('q')
+        view[offset:offset+len(a)]=array('q', a)
+        view.release()
+    finally:
+        dst.close()
+
+def benchmark_parallel(n: int = 10**7, workers: Iterable[int] = (1, 2, 4, 8, 16)) -> None:
+    """ワーカー数を変えて parallel_sort の実行時間を sorted() と比べる"""
+    data=[randrange(-2**62, 2**62) for _ in range(n)]
+    start=default_timer()
+    sorted(data)
+    base=default_timer()-start
+    print(f"{n=:,} sorted()    {base:.2f}s")
+    for w in workers:
+        start=default_timer()
+        parallel_sort(data, workers=w)
+        elapsed=default_timer()-start
+        print(f"{n=:,} workers={w:<3} {elapsed:.2f}s  speedup x{base/elapsed:.2f} (vs sorted())")
+
+def benchmark(n: int = 10000, repeat: int = 3) -> None:
+    """n 件のランダム整数で各ソートの実行時間を出力（分布・サイズ別の詳細は sort_bench.py）"""
+    # sort_bench は mysort を import するので、循環しないよう関数内で読み込む
+    import sort_bench
+    sort_bench.run(sizes=(n,), distributions=("random",), repeat=repeat)
     
 if __name__ == "__main__":
     print(selection_sort([3, 1, 4]))
     print(quick_sort([3, 1, 4]))
+    data=[3, 1, 4]
+    intro_sort(data)
+    print(data)
     benchmark()
 
 
@@ -1,5 +1,22 @@
 from __future__ import annotations
-from typing import Iterable
+import math
+import os
+import random
+import time
+from array import array
+from collections import deque
+from heapq import heapify, heappop, heappush
+from itertools import count, repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Barrier, Lock
+from timeit import default_timer
+from typing import Iterable, Sequence
+from weakref import WeakKeyDictionary
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無い環境では array('d') と純 Python 実装を使う
+    np = None
 
 class cached_property_custom:
 
@@ -19,6 +36,80 @@ class cached_property_custom:
         return value
 
 
+class threadsafe_cached_property(cached_property_custom):
+    """計算がインスタンスごとに1回だけ行われる cached_property_custom
+
+    キャッシュ済みの値は __dict__ から直接返るので、ロックを取るのは
+    __get__ に来る未計算（コールド）のときだけです。同じインスタンスに
+    同時に来たスレッドは (インスタンス, 属性) ごとのロックで待ち、
+    先に計算したスレッドの値を受け取ります。
+
+    misses は実際に計算した回数、hits はコールドパスに来たものの
+    他のスレッドが計算済みだった（再計算を避けた）回数です。
+    """
+
+    def __init__(self, func):
+        super().__init__(func)
+        # インスタンス -> この属性用のロック。計算が済んだら捨てる
+        self._locks: WeakKeyDictionary = WeakKeyDictionary()
+        self._guard = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        with self._guard:
+            lock = self._locks.get(instance)
+            if lock is None:
+                lock = self._locks[instance] = Lock()
+        with lock:
+            # ロック待ちの間に他のスレッドが計算を終えていればそれを使う
+            try:
+                value = instance.__dict__[self.func_name]
+            except KeyError:
+                pass
+            else:
+                with self._guard:
+                    self.hits += 1
+                return value
+            value = self.func(instance)
+            instance.__dict__[self.func_name] = value
+        with self._guard:
+            self.misses += 1
+            self._locks.pop(instance, None)
+        return value
+
+    def cache_info(self) -> dict[str, int]:
+        """hits / misses のカウンタを返します。"""
+        with self._guard:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset_counters(self) -> None:
+        """カウンタを 0 に戻します。"""
+        with self._guard:
+            self.hits = self.misses = 0
+
+
+def cache_stats(cls: type) -> dict[str, dict[str, int]]:
+    """クラス（と基底クラス）の threadsafe_cached_property のカウンタを集めます。
+
+    >>> ns = NumberStats(3, 1, 2)
+    >>> NumberStats.median.reset_counters()
+    >>> ns.median, ns.median
+    (2, 2)
+    >>> cache_stats(NumberStats)["median"]
+    {'hits': 0, 'misses': 1}
+    """
+    stats = {}
+    for klass in reversed(cls.__mro__):
+        for name, attr in vars(klass).items():
+            if isinstance(attr, threadsafe_cached_property):
+                stats[name] = attr.cache_info()
+    return stats
+
+
 class NumberStats:
     """統計値計算ユーティリティ
 
@@ -44,7 +135,89 @@ class NumberStats:
     def __init__(self, *values: float | int):
         if not values:
             raise ValueError("at least one number is required")
-        self._values: tuple[float | int, ...] = tuple(values)
+        self._values: tuple[float | int, ...] | None = tuple(values)
+        self._sketch: KLLSketch | None = None
+        self._freq: dict[float | int, int] | None = None
+
+    # -------- alternative constructors --------
+    @classmethod
+    def from_iterable(
+        cls, values: Iterable[float | int], error: float | None = None
+    ) -> NumberStats:
+        """イテラブルを1パスで集計し、値を保持しない NumberStats を返します。
+
+        size / mean / variance は StreamingStats の状態から復元されます。
+        元の値を持たないため median / mode は ValueError になります。
+        error を指定すると KLLSketch を併用し、median / quantiles を
+        順位誤差 error 以内の近似値で返します。
+
+        >>> ns = NumberStats.from_iterable(x for x in (10, 8, 3, 3, 8))
+        >>> ns.size
+        5
+        >>> round(ns.mean, 2)
+        6.4
+        >>> round(ns.variance, 2)
+        10.3
+        >>> ns.median
+        Traceback (most recent call last):
+            ...
+        ValueError: raw values are not available (built from streaming state)
+
+        >>> approx = NumberStats.from_iterable(range(1001), error=0.01)
+        >>> abs(approx.median - 500) <= 10
+        True
+        """
+        acc = StreamingStats(error=error)
+        acc.extend(values)
+        return cls._from_state(acc)
+
+    @classmethod
+    def parallel(
+        cls,
+        values: Sequence[float | int],
+        workers: int | None = None,
+        error: float = 0.01,
+    ) -> NumberStats:
+        """values を workers 個に分割し、プロセスごとに集計してからマージします。
+
+        各ワーカーは StreamingStats（頻度表と KLLSketch 付き）を返すだけなので、
+        親プロセスへ送り返されるのは生データではなく部分集計です。
+        size / mean / variance / mode は厳密、median / quantiles は近似値です。
+
+        >>> ns = NumberStats.parallel([10, 8, 3, 3, 8] * 4, workers=2)
+        >>> ns.size, round(ns.mean, 2), ns.mode
+        (20, 6.4, [3, 8])
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        n = len(values)
+        chunk = max(1, -(-n // workers))
+        chunks = [values[i:i + chunk] for i in range(0, n, chunk)]
+        total = StreamingStats(error=error, track_mode=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_partial_stats, chunks, [error] * len(chunks)):
+                total.merge(part)
+        return cls._from_state(total)
+
+    @classmethod
+    def _from_state(cls, acc: StreamingStats) -> NumberStats:
+        """StreamingStats の状態から NumberStats を組み立てます（内部利用）。"""
+        if not acc.count:
+            raise ValueError("at least one number is required")
+        self = cls.__new__(cls)
+        self._values = None
+        self._sketch = acc.sketch
+        self._freq = acc.freq
+        # cached_property_custom は __dict__ の値を優先するので、
+        # 先に埋めておけば再計算されない。
+        self.__dict__.update(size=acc.count, mean=acc.mean, variance=acc.variance)
+        return self
+
+    def _require_values(self) -> tuple[float | int, ...]:
+        """元データを返します。ストリーミング状態から作った場合は ValueError。"""
+        if self._values is None:
+            raise ValueError("raw values are not available (built from streaming state)")
+        return self._values
 
     # -------- cached properties --------
     @cached_property_custom
@@ -52,33 +225,39 @@ class NumberStats:
         """データ数を返します。"""
         return len(self._values)
 
-    @cached_property_custom
+    @threadsafe_cached_property
     def mean(self) -> float:
         """平均値を返します。"""
         return sum(self._values) / self.size
 
-    @cached_property_custom
+    @threadsafe_cached_property
     def _sorted(self) -> tuple[float | int, ...]:
         """ソート済みのデータタプルを返します（内部利用）。"""
         # sorted() は組み込み関数
-        return tuple(sorted(self._values))
+        return tuple(sorted(self._require_values()))
 
-    @cached_property_custom
+    @threadsafe_cached_property
     def median(self) -> float | int:
         # 下位中央値
+        if self._values is None and self._sketch is not None:
+            return self._sketch.quantile(0.5)
         return self._sorted[(self.size - 1) // 2]
 
-    @cached_property_custom
+    @threadsafe_cached_property
     def mode(self) -> list[float | int]:
         """最頻値をリストで返します。"""
         # collections.Counter を使わずに実装
-        if not self._values:
-            return []
+        # 部分集計から作った場合は、マージ済みの頻度表をそのまま使う
+        freq = self._freq
+        if freq is None:
+            values = self._require_values()
+            if not values:
+                return []
 
-        freq = {}
-        for value in self._values:
-            # dict.get(key, default) を使い、キーが存在しない場合の初期値を0に設定
-            freq[value] = freq.get(value, 0) + 1
+            freq = {}
+            for value in values:
+                # dict.get(key, default) を使い、キーが存在しない場合の初期値を0に設定
+                freq[value] = freq.get(value, 0) + 1
         
         # max() は組み込み関数
         if not freq:
@@ -93,7 +272,7 @@ class NumberStats:
         # sorted() は組み込み関数
         return sorted(modes)
 
-    @cached_property_custom
+    @threadsafe_cached_property
     def variance(self) -> float:
         """不偏分散を返します。"""
         if self.size <= 1:
@@ -101,6 +280,21 @@ class NumberStats:
         # sum() と ** 演算子は組み込み
         return sum((x - self.mean) ** 2 for x in self._values) / (self.size - 1)
 
+    def quantiles(self, qs: Sequence[float]) -> list[float | int]:
+        """分位点をまとめて返します。
+
+        q に対して順位 floor(q * (size - 1)) の値（下位分位点）を返すので、
+        quantiles([0.5]) は median と一致します。
+
+        >>> NumberStats(10, 8, 3, 3, 8).quantiles([0.0, 0.5, 0.9, 1.0])
+        [3, 8, 8, 10]
+        """
+        _check_quantiles(qs)
+        if self._values is None and self._sketch is not None:
+            return self._sketch.quantiles(qs)
+        data = self._sorted
+        return [data[int(q * (self.size - 1))] for q in qs]
+
     # -------- misc --------
     def __iter__(self) -> Iterable[float | int]:
         """ソートされた値のイテレータを返します。"""
@@ -110,6 +304,838 @@ class NumberStats:
         """オブジェクトの文字列表現を返します。"""
         return f"<NumberStats size={self.size} mean={self.mean:.3g}>"
 
+
+class ArrayNumberStats(NumberStats):
+    """連続したバッファに値を持つ NumberStats
+
+    NumPy があれば float64 の ndarray に値を持ち、平均・分散はベクトル化した
+    リダクション、中央値は全ソートではなく選択 (np.partition)、最頻値は
+    np.unique(return_counts=True) で計算します。NumPy が無ければ array('d') に
+    値を持ち、計算は NumberStats と同じ純 Python 実装になります。
+    値はすべて float として扱います。
+
+    >>> ns = ArrayNumberStats(10, 8, 3, 3, 8)
+    >>> ns.size, ns.mean, ns.median, ns.mode
+    (5, 6.4, 8.0, [3.0, 8.0])
+    >>> round(ns.variance, 2)
+    10.3
+    >>> ArrayNumberStats.from_buffer(array('d', [1, 5, 2, 8])).median
+    2.0
+
+    from_iterable などで値を持たずに作った場合は NumberStats と同じく、
+    近似できない統計値は ValueError になります。
+
+    >>> ArrayNumberStats.from_iterable([1, 2, 3]).median
+    Traceback (most recent call last):
+        ...
+    ValueError: raw values are not available (built from streaming state)
+    """
+
+    def __init__(self, *values: float | int):
+        if not values:
+            raise ValueError("at least one number is required")
+        self._init_buffer(values)
+
+    @classmethod
+    def from_buffer(cls, data: Iterable[float | int]) -> ArrayNumberStats:
+        """array / ndarray / イテラブルから、タプルを経由せずに作ります。"""
+        self = cls.__new__(cls)
+        self._init_buffer(data)
+        if not self.size:
+            raise ValueError("at least one number is required")
+        return self
+
+    def _init_buffer(self, data: Iterable[float | int]) -> None:
+        """値を float64 の連続バッファに格納します（内部利用）。"""
+        if np is not None:
+            if not hasattr(data, "__len__"):
+                data = list(data)
+            self._values = np.asarray(data, dtype=np.float64)
+        elif isinstance(data, array) and data.typecode == "d":
+            self._values = data
+        else:
+            self._values = array("d", data)
+        self._sketch = None
+        self._freq = None
+
+    @threadsafe_cached_property
+    def mean(self) -> float:
+        """平均値を返します。"""
+        if np is not None:
+            return float(self._values.mean())
+        return sum(self._values) / self.size
+
+    @threadsafe_cached_property
+    def _sorted(self):
+        """ソート済みのデータを返します（内部利用）。"""
+        if self._values is None:
+            return NumberStats._sorted.func(self)
+        if np is not None:
+            return np.sort(self._values)
+        return tuple(sorted(self._values))
+
+    @threadsafe_cached_property
+    def median(self) -> float:
+        # 下位中央値。全体をソートせず k 番目だけを選択する
+        if self._values is None:
+            # ストリーミング状態から作った場合はスケッチの近似値か ValueError
+            return NumberStats.median.func(self)
+        if np is not None:
+            k = (self.size - 1) // 2
+            return float(np.partition(self._values, k)[k])
+        return self._sorted[(self.size - 1) // 2]
+
+    @threadsafe_cached_property
+    def mode(self) -> list[float]:
+        """最頻値をリストで返します。"""
+        if np is not None and self._values is not None:
+            uniq, counts = np.unique(self._values, return_counts=True)
+            return uniq[counts == counts.max()].tolist()
+        return NumberStats.mode.func(self)
+
+    @threadsafe_cached_property
+    def variance(self) -> float:
+        """不偏分散を返します。"""
+        if self.size <= 1:
+            return 0.0
+        if np is not None:
+            return float(self._values.var(ddof=1))
+        return NumberStats.variance.func(self)
+
+    def quantiles(self, qs: Sequence[float]) -> list[float]:
+        """分位点をまとめて返します。NumPy があれば必要な順位だけを選択します。"""
+        if np is None or self._values is None or "_sorted" in self.__dict__:
+            return super().quantiles(qs)
+        _check_quantiles(qs)
+        ranks = [int(q * (self.size - 1)) for q in qs]
+        selected = np.partition(self._values, sorted(set(ranks)))
+        return [float(selected[r]) for r in ranks]
+
+    def __iter__(self) -> Iterable[float]:
+        """ソートされた値のイテレータを返します。"""
+        data = self._sorted
+        return iter(data.tolist() if np is not None and self._values is not None else data)
+
+
+# remove の引き算で有効桁がこの割合より小さくなったら、平均と分散を計算し直す
+_CANCELLATION = 2.0 ** -20
+
+
+class MutableNumberStats(NumberStats):
+    """append / extend / remove で値を増減できる NumberStats
+
+    平均と分散は Welford 法の追加・削除、最頻値は「出現回数ごとの値の集合」で
+    O(1) 更新し、中央値は2本のヒープ (_MedianHeaps) で O(log n) 更新します。
+    変更時には影響を受けるキャッシュだけを __dict__ から取り除きます。
+
+    >>> ns = MutableNumberStats(10, 8, 3)
+    >>> ns.median, ns.mode
+    (8, [3, 8, 10])
+    >>> ns.extend([3, 8])
+    >>> ns.size, round(ns.mean, 2), ns.median, ns.mode
+    (5, 6.4, 8, [3, 8])
+    >>> round(ns.variance, 2)
+    10.3
+    >>> ns.remove(8)
+    >>> ns.median, ns.mode, list(ns)
+    (3, [3], [3, 3, 8, 10])
+
+    桁違いに大きい値を取り除いても、平均と分散は桁落ちしません。
+
+    >>> big = MutableNumberStats(1e16, 1, 1, 1, 2)
+    >>> big.remove(1e16)
+    >>> big.mean, big.variance
+    (1.25, 0.25)
+    """
+
+    def __init__(self, *values: float | int):
+        self._values = None
+        self._sketch = None
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        # 値 -> 出現回数、出現回数 -> その回数の値の集合
+        self._freq: dict[float | int, int] = {}
+        self._by_count: dict[int, set[float | int]] = {}
+        self._max_count = 0
+        self._heaps = _MedianHeaps()
+        self.extend(values)
+
+    # -------- alternative constructors --------
+    # 値を増減するには頻度表とヒープが要るので、集計状態だけからは作らず、
+    # 値を1つずつ extend で加えて組み立てます。
+    @classmethod
+    def from_iterable(
+        cls, values: Iterable[float | int], error: float | None = None
+    ) -> MutableNumberStats:
+        """イテラブルの値をすべて加えた MutableNumberStats を返します（error は無視し、常に厳密）。
+
+        >>> ns = MutableNumberStats.from_iterable(iter([1, 2, 3]))
+        >>> ns.median, ns.mean
+        (2, 2.0)
+        >>> ns.remove(3); ns.median
+        1
+        """
+        self = cls()
+        self.extend(values)
+        return self
+
+    @classmethod
+    def parallel(
+        cls,
+        values: Sequence[float | int],
+        workers: int | None = None,
+        error: float = 0.01,
+    ) -> MutableNumberStats:
+        """部分集計は値を持たないのでマージできず、from_iterable と同じく1プロセスで組み立てます。
+
+        >>> MutableNumberStats.parallel([10, 8, 3, 3, 8], workers=2).mode
+        [3, 8]
+        """
+        return cls.from_iterable(values)
+
+    @classmethod
+    def _from_state(cls, acc: StreamingStats) -> MutableNumberStats:
+        raise TypeError("MutableNumberStats cannot be built from streaming state")
+
+    # -------- mutation --------
+    def append(self, x: float | int) -> None:
+        """値を1つ追加します。"""
+        self._invalidate(self._add(x))
+
+    def extend(self, values: Iterable[float | int]) -> None:
+        """イテラブルの値をすべて追加します。"""
+        mode_changed = False
+        for x in values:
+            mode_changed |= self._add(x)
+        self._invalidate(mode_changed)
+
+    def remove(self, x: float | int) -> None:
+        """値を1つ取り除きます。存在しなければ ValueError。"""
+        c = self._freq.get(x)
+        if not c:
+            raise ValueError(f"{x!r} is not in stats")
+        # Welford 法の逆操作
+        n = self._count - 1
+        recompute = False
+        if n:
+            old_mean = self._mean
+            total = self._count * old_mean
+            self._mean = (total - x) / n
+            removed = (x - old_mean) * (x - self._mean)
+            self._m2 -= removed
+            # 引き算で桁落ちしたら（外れ値が抜けたときなど）、残りの値から計算し直す
+            recompute = (abs(total - x) < _CANCELLATION * max(abs(total), abs(x))
+                         or self._m2 < _CANCELLATION * removed)
+        else:
+            self._mean = self._m2 = 0.0
+        self._count = n
+        # 出現回数の表を c -> c-1 に更新
+        bucket = self._by_count[c]
+        bucket.remove(x)
+        if not bucket:
+            del self._by_count[c]
+            if c == self._max_count:
+                self._max_count -= 1
+        if c > 1:
+            self._freq[x] = c - 1
+            self._by_count.setdefault(c - 1, set()).add(x)
+        else:
+            del self._freq[x]
+        self._heaps.remove(x)
+        if recompute:
+            self._recompute_moments()
+        self._invalidate(c >= self._max_count)
+
+    def _recompute_moments(self) -> None:
+        """頻度表から平均と偏差平方和を計算し直します（異なる値の数に比例、内部利用）。"""
+        freq = self._freq
+        self._mean = math.fsum(v * c for v, c in freq.items()) / self._count
+        mean = self._mean
+        self._m2 = math.fsum(c * (v - mean) ** 2 for v, c in freq.items())
+
+    def _add(self, x: float | int) -> bool:
+        """値を1つ加え、最頻値が変わりうるかを返します（内部利用）。"""
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+        c = self._freq.get(x, 0)
+        if c:
+            bucket = self._by_count[c]
+            bucket.remove(x)
+            if not bucket:
+                del self._by_count[c]
+        self._freq[x] = c + 1
+        self._by_count.setdefault(c + 1, set()).add(x)
+        mode_changed = c + 1 >= self._max_count
+        if c + 1 > self._max_count:
+            self._max_count = c + 1
+        self._heaps.push(x)
+        return mode_changed
+
+    def _invalidate(self, mode_changed: bool) -> None:
+        """変更の影響を受けるキャッシュだけを捨てます（内部利用）。"""
+        names = ("size", "mean", "variance", "median", "_sorted")
+        if mode_changed:
+            names += ("mode",)
+        for name in names:
+            self.__dict__.pop(name, None)
+
+    # -------- cached properties --------
+    @cached_property_custom
+    def size(self) -> int:
+        """データ数を返します。"""
+        return self._count
+
+    @cached_property_custom
+    def mean(self) -> float:
+        """平均値を返します。"""
+        self._require_nonempty()
+        return self._mean
+
+    @cached_property_custom
+    def variance(self) -> float:
+        """不偏分散を返します。"""
+        if self._count <= 1:
+            return 0.0
+        return max(self._m2, 0.0) / (self._count - 1)
+
+    @cached_property_custom
+    def median(self) -> float | int:
+        # 下位中央値
+        self._require_nonempty()
+        return self._heaps.median()
+
+    @cached_property_custom
+    def mode(self) -> list[float | int]:
+        """最頻値をリストで返します。"""
+        if not self._max_count:
+            return []
+        return sorted(self._by_count[self._max_count])
+
+    @cached_property_custom
+    def _sorted(self) -> tuple[float | int, ...]:
+        """ソート済みのデータタプルを返します（内部利用）。"""
+        # 頻度表から組み立てるので、ソート対象は異なる値の数だけで済む
+        freq = self._freq
+        return tuple(v for k in sorted(freq) for v in repeat(k, freq[k]))
+
+    def _require_nonempty(self) -> None:
+        if not self._count:
+            raise ValueError("no values in stats")
+
+    def __repr__(self) -> str:
+        """オブジェクトの文字列表現を返します。"""
+        if not self._count:
+            return f"<{type(self).__name__} size=0>"
+        return f"<{type(self).__name__} size={self.size} mean={self.mean:.3g}>"
+
+
+class RollingStats:
+    """直近 window 件、または直近 seconds 秒の値だけを対象にした統計値
+
+    内部の MutableNumberStats に追加・削除を伝えるだけなので、古い値の
+    追い出しは平均・分散が O(1)、中央値が O(log n)、最頻値が O(1) で済み、
+    ウィンドウ全体を作り直したりソートし直したりしません。
+    両方を指定した場合は、どちらかの条件を外れた値を追い出します。
+
+    >>> rs = RollingStats(window=3)
+    >>> for x in (10, 8, 3, 3, 8):
+    ...     rs.push(x)
+    >>> rs.size, rs.median, rs.mode
+    (3, 3, [3])
+    >>> round(rs.mean, 2)
+    4.67
+
+    >>> ts = RollingStats(seconds=10)
+    >>> ts.push(1, now=0.0); ts.push(5, now=4.0); ts.push(9, now=12.0)
+    >>> ts.size, ts.median
+    (2, 5)
+    >>> ts.expire(now=20.0)
+    >>> ts.size
+    1
+
+    外れ値がウィンドウから抜けたあとも、平均と分散は残った値どおりに戻ります。
+
+    >>> spike = RollingStats(window=3)
+    >>> for x in (100, 102, 98, 1e12, 101, 99, 100):
+    ...     spike.push(x)
+    >>> spike.mean, spike.variance
+    (100.0, 1.0)
+    >>> huge = RollingStats(window=3)
+    >>> for x in (1e16, 1, 1, 1, 1):
+    ...     huge.push(x)
+    >>> huge.mean, huge.variance
+    (1.0, 0.0)
+    """
+
+    def __init__(self, window: int | None = None, seconds: float | None = None,
+                 clock=time.monotonic):
+        if window is None and seconds is None:
+            raise ValueError("either window or seconds is required")
+        if window is not None and window < 1:
+            raise ValueError("window must be positive")
+        if seconds is not None and seconds <= 0:
+            raise ValueError("seconds must be positive")
+        self.window = window
+        self.seconds = seconds
+        self._clock = clock
+        # (時刻, 値) を古い順に持つ
+        self._samples: deque[tuple[float, float | int]] = deque()
+        self.stats = MutableNumberStats()
+
+    def push(self, x: float | int, now: float | None = None) -> None:
+        """値を1つ追加し、ウィンドウから外れた値を追い出します。"""
+        if now is None:
+            now = self._clock()
+        self._samples.append((now, x))
+        self.stats.append(x)
+        self.expire(now)
+
+    def expire(self, now: float | None = None) -> None:
+        """ウィンドウから外れた値を追い出します。"""
+        samples, stats = self._samples, self.stats
+        if self.window is not None:
+            while len(samples) > self.window:
+                stats.remove(samples.popleft()[1])
+        if self.seconds is not None:
+            if now is None:
+                now = self._clock()
+            limit = now - self.seconds
+            while samples and samples[0][0] <= limit:
+                stats.remove(samples.popleft()[1])
+
+    # -------- NumberStats と同じプロパティ --------
+    @property
+    def size(self) -> int:
+        return self.stats.size
+
+    @property
+    def mean(self) -> float:
+        return self.stats.mean
+
+    @property
+    def median(self) -> float | int:
+        return self.stats.median
+
+    @property
+    def mode(self) -> list[float | int]:
+        return self.stats.mode
+
+    @property
+    def variance(self) -> float:
+        return self.stats.variance
+
+    def quantiles(self, qs: Sequence[float]) -> list[float | int]:
+        return self.stats.quantiles(qs)
+
+    def __iter__(self) -> Iterable[float | int]:
+        """ソートされた値のイテレータを返します。"""
+        return iter(self.stats)
+
+    def __repr__(self) -> str:
+        return f"<RollingStats window={self.window} seconds={self.seconds} size={self.size}>"
+
+
+class _MedianHeaps:
+    """下位中央値を O(log n) で保つ2本のヒープ（遅延削除つき、内部利用）
+
+    low は小さい側の半分を (-x, seq) で持つ最大ヒープ、high は大きい側の
+    半分を (x, seq) で持つ最小ヒープです。削除は seq を無効にするだけで、
+    ヒープの先頭に来たときに取り除きます。
+    """
+
+    __slots__ = ("_low", "_high", "_low_size", "_high_size", "_side", "_seqs", "_counter")
+
+    def __init__(self):
+        self._low: list[tuple[float | int, int]] = []
+        self._high: list[tuple[float | int, int]] = []
+        # 有効な要素数（無効化済みの要素は含まない）
+        self._low_size = 0
+        self._high_size = 0
+        # seq -> low 側にあれば True、値 -> 有効な seq のリスト
+        self._side: dict[int, bool] = {}
+        self._seqs: dict[float | int, list[int]] = {}
+        self._counter = count()
+
+    def push(self, x: float | int) -> None:
+        seq = next(self._counter)
+        self._seqs.setdefault(x, []).append(seq)
+        self._prune(self._low)
+        if not self._low or x <= -self._low[0][0]:
+            heappush(self._low, (-x, seq))
+            self._side[seq] = True
+            self._low_size += 1
+        else:
+            heappush(self._high, (x, seq))
+            self._side[seq] = False
+            self._high_size += 1
+        self._rebalance()
+
+    def remove(self, x: float | int) -> None:
+        seqs = self._seqs[x]
+        seq = seqs.pop()
+        if not seqs:
+            del self._seqs[x]
+        if self._side.pop(seq):
+            self._low_size -= 1
+        else:
+            self._high_size -= 1
+        # 無効な要素が有効な要素より多くなったら作り直してメモリを抑える
+        if len(self._low) + len(self._high) > 2 * len(self._side) + 64:
+            self._compact()
+        self._rebalance()
+
+    def _compact(self) -> None:
+        side = self._side
+        self._low = [e for e in self._low if e[1] in side]
+        self._high = [e for e in self._high if e[1] in side]
+        heapify(self._low)
+        heapify(self._high)
+
+    def median(self) -> float | int:
+        return -self._low[0][0]
+
+    def _prune(self, heap: list[tuple[float | int, int]]) -> None:
+        side = self._side
+        while heap and heap[0][1] not in side:
+            heappop(heap)
+
+    def _rebalance(self) -> None:
+        # low の要素数を high と同じか1つ多い状態に保つ
+        low, high, side = self._low, self._high, self._side
+        self._prune(low)
+        self._prune(high)
+        while self._low_size > self._high_size + 1:
+            neg, seq = heappop(low)
+            heappush(high, (-neg, seq))
+            side[seq] = False
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(low)
+        while self._low_size < self._high_size:
+            x, seq = heappop(high)
+            heappush(low, (-x, seq))
+            side[seq] = True
+            self._high_size -= 1
+            self._low_size += 1
+            self._prune(high)
+
+
+class StreamingStats:
+    """Welford法による1パス統計アキュムレータ
+
+    値そのものは保持せず、件数・平均・偏差平方和 (M2) だけを持つので、
+    メモリ使用量はデータ数に依存しません。track_mode=True で頻度表、
+    error を指定すると KLLSketch も併せて持ちます。pickle 可能で、
+    merge() で別プロセスの部分集計と結合できます。
+
+    >>> acc = StreamingStats()
+    >>> for x in (10, 8, 3, 3, 8):
+    ...     acc.push(x)
+    >>> acc.count
+    5
+    >>> round(acc.mean, 2)
+    6.4
+    >>> round(acc.variance, 2)
+    10.3
+    >>> acc.to_stats()
+    <NumberStats size=5 mean=6.4>
+    """
+
+    __slots__ = ("count", "_mean", "_m2", "sketch", "freq")
+
+    def __init__(self, error: float | None = None, track_mode: bool = False):
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        # 分位点・最頻値が必要な場合だけスケッチと頻度表を持つ
+        self.sketch = KLLSketch(error) if error is not None else None
+        self.freq: dict[float | int, int] | None = {} if track_mode else None
+
+    def push(self, x: float | int) -> None:
+        """値を1つ追加します。"""
+        if self.sketch is not None:
+            self.sketch.push(x)
+        if self.freq is not None:
+            self.freq[x] = self.freq.get(x, 0) + 1
+        self.count += 1
+        delta = x - self._mean
+        self._mean += delta / self.count
+        # 更新前と更新後の平均との差の積を足し込む
+        self._m2 += delta * (x - self._mean)
+
+    def extend(self, values: Iterable[float | int]) -> None:
+        """イテラブルの値をすべて追加します。"""
+        # 属性アクセスを減らすため、ループ中はローカル変数で計算する
+        n, mean, m2 = self.count, self._mean, self._m2
+        push = self.sketch.push if self.sketch is not None else None
+        freq = self.freq
+        for x in values:
+            if push is not None:
+                push(x)
+            if freq is not None:
+                freq[x] = freq.get(x, 0) + 1
+            n += 1
+            delta = x - mean
+            mean += delta / n
+            m2 += delta * (x - mean)
+        self.count, self._mean, self._m2 = n, mean, m2
+
+    @property
+    def mean(self) -> float:
+        """平均値を返します。"""
+        if not self.count:
+            raise ValueError("no values have been pushed")
+        return self._mean
+
+    @property
+    def variance(self) -> float:
+        """不偏分散を返します。"""
+        if self.count <= 1:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    def merge(self, other: StreamingStats) -> StreamingStats:
+        """別の部分集計をこのオブジェクトに取り込み、self を返します。
+
+        平均と M2 は並列分散の公式 (Chan et al.) で結合します。
+
+        >>> a, b = StreamingStats(track_mode=True), StreamingStats(track_mode=True)
+        >>> a.extend([10, 8, 3])
+        >>> b.extend([3, 8])
+        >>> merged = a.merge(b)
+        >>> merged.count, round(merged.mean, 2), round(merged.variance, 2)
+        (5, 6.4, 10.3)
+        >>> merged.freq
+        {10: 1, 8: 2, 3: 2}
+        """
+        if not other.count:
+            return self
+        n = self.count + other.count
+        delta = other._mean - self._mean
+        self._mean += delta * other.count / n
+        self._m2 += other._m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        if self.freq is not None:
+            if other.freq is None:
+                raise ValueError("cannot merge: other partial has no frequency table")
+            freq = self.freq
+            for k, v in other.freq.items():
+                freq[k] = freq.get(k, 0) + v
+        if self.sketch is not None:
+            if other.sketch is None:
+                raise ValueError("cannot merge: other partial has no sketch")
+            self.sketch.merge(other.sketch)
+        return self
+
+    def to_stats(self) -> NumberStats:
+        """現在の状態から NumberStats を作ります。"""
+        return NumberStats._from_state(self)
+
+    def __repr__(self) -> str:
+        return f"<StreamingStats count={self.count} mean={self._mean:.3g}>"
+
+
+def _partial_stats(chunk: Sequence[float | int], error: float) -> StreamingStats:
+    """ワーカープロセスで1チャンク分の部分集計を作ります（内部利用）。"""
+    acc = StreamingStats(error=error, track_mode=True)
+    acc.extend(chunk)
+    return acc
+
+
+def _check_quantiles(qs: Sequence[float]) -> None:
+    """分位点の指定が [0, 1] に収まっているか確認します（内部利用）。"""
+    for q in qs:
+        if not 0.0 <= q <= 1.0:
+            raise ValueError(f"quantile must be in [0, 1], got {q!r}")
+
+
+# k = ceil(_KLL_K_FACTOR / error) とすると、実測で順位誤差がほぼ error 以内に収まる
+_KLL_K_FACTOR = 2.0
+
+
+class KLLSketch:
+    """KLL分位点スケッチ
+
+    レベル h のコンパクタに重み 2**h の代表値を持ち、溢れたら
+    ソートして1つおきに上のレベルへ送ります。保持する値の数は
+    O(k) 程度なので、データ数に関係なく小さなメモリで分位点を推定できます。
+    error は正規化した順位誤差の目安で、高い確率でこの範囲に収まります。
+
+    >>> sk = KLLSketch(error=0.01, seed=0)
+    >>> sk.extend(range(100_000))
+    >>> [abs(v - q * 99_999) <= 1_000 for q, v in
+    ...  zip((0.5, 0.9, 0.99), sk.quantiles((0.5, 0.9, 0.99)))]
+    [True, True, True]
+    >>> sk.n
+    100000
+    """
+
+    __slots__ = ("error", "k", "n", "_compactors", "_size", "_max_size", "_rng")
+
+    def __init__(self, error: float = 0.01, *, seed: int | None = None):
+        if not 0.0 < error < 1.0:
+            raise ValueError("error must be in (0, 1)")
+        self.error = error
+        self.k = max(8, math.ceil(_KLL_K_FACTOR / error))
+        self.n = 0
+        self._compactors: list[list[float | int]] = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._rng = random.Random(seed)
+
+    def _capacity(self, h: int) -> int:
+        """レベル h のコンパクタの容量。上のレベルほど大きい（内部利用）。"""
+        depth = len(self._compactors) - h - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def push(self, x: float | int) -> None:
+        """値を1つ追加します。"""
+        self._compactors[0].append(x)
+        self.n += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def extend(self, values: Iterable[float | int]) -> None:
+        """イテラブルの値をすべて追加します。"""
+        push = self.push
+        for x in values:
+            push(x)
+
+    def _compress(self) -> None:
+        """容量を超えたレベルを1つ上へ圧縮します（内部利用）。"""
+        compactors = self._compactors
+        for h in range(len(compactors)):
+            items = compactors[h]
+            if len(items) < self._capacity(h):
+                continue
+            if h + 1 == len(compactors):
+                compactors.append([])
+                self._max_size = sum(self._capacity(i) for i in range(len(compactors)))
+            items.sort()
+            # 奇数個のときは最後の1つをこのレベルに残す
+            keep = [items.pop()] if len(items) % 2 else []
+            compactors[h + 1].extend(items[self._rng.getrandbits(1)::2])
+            compactors[h] = keep
+            self._size = sum(len(c) for c in compactors)
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other: KLLSketch) -> KLLSketch:
+        """別のスケッチをレベルごとに結合し、self を返します。"""
+        compactors = self._compactors
+        for h, items in enumerate(other._compactors):
+            if h == len(compactors):
+                compactors.append([])
+            compactors[h].extend(items)
+        self.n += other.n
+        self._size = sum(len(c) for c in compactors)
+        self._max_size = sum(self._capacity(i) for i in range(len(compactors)))
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> list[float | int]:
+        """分位点の推定値をまとめて返します（NumberStats.quantiles と同じ順位の定義）。"""
+        if not self.n:
+            raise ValueError("no values have been pushed")
+        _check_quantiles(qs)
+        weighted = sorted(
+            (x, 1 << h) for h, items in enumerate(self._compactors) for x in items
+        )
+        # 目標順位の小さい順に、重みの累積を1回だけ走査する
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        result: list[float | int] = [0] * len(qs)
+        cum = 0
+        pos = 0
+        for i in order:
+            rank = int(qs[i] * (self.n - 1))
+            while pos < len(weighted) - 1 and cum + weighted[pos][1] <= rank:
+                cum += weighted[pos][1]
+                pos += 1
+            result[i] = weighted[pos][0]
+        return result
+
+    def quantile(self, q: float) -> float | int:
+        """分位点を1つ推定します。"""
+        return self.quantiles((q,))[0]
+
+    def __repr__(self) -> str:
+        return f"<KLLSketch n={self.n} k={self.k} retained={self._size}>"
+
+
+def benchmark_quantiles(
+    sizes: Sequence[int] = (10**6, 10**7, 10**8),
+    error: float = 0.01,
+    exact_limit: int = 10**7,
+) -> None:
+    """KLLSketch と厳密な _sorted 経由の分位点計算を比較します。
+
+    exact_limit を超えるサイズでは厳密計算（全件のタプルとソート）を省略します。
+    """
+    qs = (0.5, 0.9, 0.99)
+    for n in sizes:
+        rng = random.Random(n)
+        start = default_timer()
+        approx = NumberStats.from_iterable(
+            (rng.random() for _ in range(n)), error=error
+        )
+        approx_q = approx.quantiles(qs)
+        t_sketch = default_timer() - start
+        line = f"{n=:>11,}  sketch: {t_sketch:8.2f}s"
+        if n <= exact_limit:
+            rng = random.Random(n)
+            start = default_timer()
+            exact = NumberStats(*(rng.random() for _ in range(n)))
+            exact_q = exact.quantiles(qs)
+            t_exact = default_timer() - start
+            # 乱数列が同じなので、一様分布の値の差がそのまま順位誤差の目安になる
+            worst = max(abs(a - e) for a, e in zip(approx_q, exact_q))
+            line += f"   exact: {t_exact:8.2f}s   max rank error ~{worst:.4f}"
+        print(line)
+
+def benchmark_concurrency(threads: int = 8, n: int = 10**6) -> None:
+    """コールドな NumberStats に多数のスレッドが同時にアクセスしたときの
+    計算回数（misses）と、再計算を避けた回数（hits）を表示します。"""
+    rng = random.Random(n)
+    ns = NumberStats(*(rng.random() for _ in range(n)))
+    for prop in cache_stats(NumberStats):
+        getattr(NumberStats, prop).reset_counters()
+    barrier = Barrier(threads)
+
+    def read(_):
+        barrier.wait()
+        return ns.variance, ns.median
+
+    start = default_timer()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(read, range(threads)))
+    elapsed = default_timer() - start
+    print(f"{threads=} {n=:,}  {elapsed:.3f}s")
+    for name, info in cache_stats(NumberStats).items():
+        print(f"  {name:<9} hits={info['hits']:<3} misses={info['misses']}")
+
+
+def benchmark_backends(sizes: Sequence[int] = (10**5, 10**6, 10**7)) -> None:
+    """NumberStats と ArrayNumberStats で全プロパティの計算時間を比較します。"""
+    engine = "numpy" if np is not None else "array('d')"
+    for n in sizes:
+        rng = random.Random(n)
+        # 最頻値が意味を持つよう、値の種類を n/10 程度に抑える
+        data = [float(rng.randrange(n // 10 + 1)) for _ in range(n)]
+        timings = []
+        for build in (lambda: NumberStats(*data), lambda: ArrayNumberStats.from_buffer(data)):
+            start = default_timer()
+            ns = build()
+            ns.mean, ns.variance, ns.median, ns.mode
+            timings.append(default_timer() - start)
+        py, vec = timings
+        print(f"{n=:>11,}  tuple: {py:7.3f}s   {engine}: {vec:7.3f}s   x{py / vec:.1f}")
+
+
 def main():
     ns = NumberStats(10, 8, 3, 3, 8)
     print(ns.size)
@@ -0,0 +1,298 @@
+"""リポジトリ内のソート関数をまとめて計測するベンチマークハーネス
+
+データ分布（random / sorted / reverse / few_unique / organ_pipe）と
+サイズの組み合わせごとに、実行時間の中央値と IQR・比較回数・ピークメモリを
+測り、コミット間で比較できるよう JSON に書き出します。
+
+    python sort_bench.py --sizes 100 1000 10000 --out bench.json
+    python sort_bench.py --sizes 100 1000 10000 --compare bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from random import Random
+from timeit import default_timer
+from typing import Callable
+
+import mysort
+from number_stats import NumberStats
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = (10**2, 10**3, 10**4, 10**5, 10**6)
+
+
+# -------- データ分布 --------
+def _random(n: int, rng: Random) -> list[int]:
+    return [rng.randrange(n) for _ in range(n)]
+
+def _sorted(n: int, rng: Random) -> list[int]:
+    return list(range(n))
+
+def _reverse(n: int, rng: Random) -> list[int]:
+    return list(range(n, 0, -1))
+
+def _few_unique(n: int, rng: Random) -> list[int]:
+    return [rng.randrange(10) for _ in range(n)]
+
+def _organ_pipe(n: int, rng: Random) -> list[int]:
+    half = n // 2
+    return list(range(half)) + list(range(n - half, 0, -1))
+
+DISTRIBUTIONS: dict[str, Callable[[int, Random], list[int]]] = {
+    "random": _random,
+    "sorted": _sorted,
+    "reverse": _reverse,
+    "few_unique": _few_unique,
+    "organ_pipe": _organ_pipe,
+}
+
+
+# -------- 計測対象のソート --------
+def _load_script(name: str, path: str):
+    """パッケージになっていないスクリプトをモジュールとして読み込む"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # トップレベルのデモ出力は捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+def _in_place(sort: Callable[[list], object]) -> Callable[[list], list]:
+    """in-place のソートを「新しいリストを返す」形にそろえる"""
+    def run(data: list) -> list:
+        a = data.copy()
+        sort(a)
+        return a
+    run.__name__ = sort.__name__
+    return run
+
+# 先頭要素をピボットにするクイックソートが O(n^2) の時間と再帰・コピーを起こす分布
+_ADVERSARIAL = {"sorted": 10**4, "reverse": 10**4, "organ_pipe": 10**4}
+
+def algorithms() -> dict[str, tuple[Callable[[list], list], int | dict[str, int] | None]]:
+    """名前 -> (ソート関数, 計測する最大サイズ) を返す
+
+    最大サイズは全分布共通の上限か、分布名 -> 上限の辞書（辞書にない分布は上限なし）。
+    """
+    heap = _load_script("heap_sort", os.path.join(_ROOT, "chatgpt", "heap_sort.py"))
+    return {
+        # O(n^2) なので大きいサイズは省く
+        "selection_sort": (mysort.selection_sort, 10**4),
+        # 整列済みに近い分布では分割が偏って O(n^2) になり、10^6 でメモリを使い切る
+        "quick_sort": (mysort.quick_sort, _ADVERSARIAL),
+        "intro_sort": (_in_place(mysort.intro_sort), None),
+        "heap_sort": (_in_place(heap.heap_sort), None),
+        # ベンチマークの分布はどれも値の範囲が n 程度なので計数ソートも計測できる
+        "counting_sort": (mysort.counting_sort, None),
+        "radix_sort": (mysort.radix_sort, None),
+        "auto_sort": (mysort.auto_sort, None),
+        "sorted": (sorted, None),
+    }
+
+
+# -------- 比較回数の計測 --------
+class _Counted:
+    """比較演算のたびにカウンタを増やすラッパー"""
+    __slots__ = ("v",)
+    calls = 0
+
+    def __init__(self, v):
+        self.v = v
+
+    def __lt__(self, other):
+        _Counted.calls += 1
+        return self.v < other.v
+
+    def __le__(self, other):
+        _Counted.calls += 1
+        return self.v <= other.v
+
+    def __gt__(self, other):
+        _Counted.calls += 1
+        return self.v > other.v
+
+    def __ge__(self, other):
+        _Counted.calls += 1
+        return self.v >= other.v
+
+    def __eq__(self, other):
+        _Counted.calls += 1
+        return self.v == other.v
+
+    __hash__ = None
+
+def count_comparisons(sort: Callable[[list], list], data: list[int]) -> int | None:
+    """比較回数を数える。キーを算術に使う非比較ソート（計数・基数）は None"""
+    # auto_sort はラッパーを渡すと必ず比較ソートを選ぶので、実データでの選択で判断する
+    if sort is mysort.auto_sort and mysort._choose_sort(data) is not mysort.intro_sort:
+        return None
+    _Counted.calls = 0
+    try:
+        sort([_Counted(x) for x in data])
+    except TypeError:
+        return None
+    return _Counted.calls
+
+def peak_memory(sort: Callable[[list], list], data: list[int]) -> int:
+    """ソート中に追加で確保されたメモリのピーク（バイト）"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        sort(data)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+# -------- 実行 --------
+def measure(sort: Callable[[list], list], data: list[int], repeat: int) -> dict:
+    """1つの (アルゴリズム, 分布, サイズ) を計測して結果の辞書を返す"""
+    expected = sorted(data)
+    try:
+        if list(sort(data)) != expected:
+            return {"status": "incorrect"}
+        times = []
+        for _ in range(repeat):
+            start = default_timer()
+            sort(data)
+            times.append(default_timer() - start)
+        comparisons = count_comparisons(sort, data)
+        peak = peak_memory(sort, data)
+    except RecursionError:
+        return {"status": "recursion_error"}
+    except Exception as e:
+        return {"status": f"error: {type(e).__name__}: {e}"}
+    q1, median, q3 = NumberStats(*times).quantiles((0.25, 0.5, 0.75))
+    return {
+        "status": "ok",
+        "median_s": median,
+        "q1_s": q1,
+        "q3_s": q3,
+        "iqr_s": q3 - q1,
+        "comparisons": comparisons,
+        "peak_bytes": peak,
+    }
+
+def _skipped(max_n: int | dict[str, int] | None, dist: str, n: int) -> bool:
+    if isinstance(max_n, dict):
+        max_n = max_n.get(dist)
+    return max_n is not None and n > max_n
+
+def run(
+    sizes=DEFAULT_SIZES,
+    distributions=tuple(DISTRIBUTIONS),
+    names=None,
+    repeat: int = 5,
+    seed: int = 0,
+    verbose: bool = True,
+    out: str | None = None,
+) -> dict:
+    """全組み合わせを計測し、JSON にそのまま書ける辞書を返す
+
+    out を渡すと1行計測するたびにそこまでの結果を書き出すので、途中で
+    止まったり落ちたりしても、それまでの結果は残ります。
+    """
+    algos = algorithms()
+    if names is not None:
+        algos = {name: algos[name] for name in names}
+    report = {"meta": _metadata(seed), "results": []}
+    for n in sizes:
+        for dist in distributions:
+            data = DISTRIBUTIONS[dist](n, Random(seed))
+            for name, (sort, max_n) in algos.items():
+                if _skipped(max_n, dist, n):
+                    row = {"status": "skipped"}
+                else:
+                    row = measure(sort, data, repeat)
+                row = {"algorithm": name, "distribution": dist, "n": n, "repeat": repeat, **row}
+                report["results"].append(row)
+                if verbose:
+                    print(format_row(row), flush=True)
+                if out:
+                    _write_report(report, out)
+    return report
+
+def _write_report(report: dict, path: str) -> None:
+    """一時ファイルに書いてから置き換え、読み手が書きかけの JSON を見ないようにする"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+
+def _metadata(seed: int) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": seed,
+    }
+
+def format_row(row: dict) -> str:
+    head = f"{row['algorithm']:<15} {row['distribution']:<11} n={row['n']:<8}"
+    if row["status"] != "ok":
+        return f"{head} {row['status']}"
+    return (f"{head} median={row['median_s']:.6f}s iqr={row['iqr_s']:.6f}s "
+            f"cmp={row['comparisons'] if row['comparisons'] is not None else '-':<10} peak={row['peak_bytes'] / 1024:.0f}KiB")
+
+def compare(baseline: dict, current: dict, threshold: float = 1.2) -> list[str]:
+    """中央値が baseline の threshold 倍より遅くなった組み合わせを返す"""
+    key = lambda r: (r["algorithm"], r["distribution"], r["n"])
+    old = {key(r): r for r in baseline["results"] if r["status"] == "ok"}
+    regressions = []
+    for row in current["results"]:
+        before = old.get(key(row))
+        if before is None or row["status"] != "ok":
+            continue
+        ratio = row["median_s"] / before["median_s"]
+        if ratio > threshold:
+            regressions.append(f"{format_row(row)}  x{ratio:.2f} slower")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--distributions", nargs="+", default=list(DISTRIBUTIONS),
+                        choices=list(DISTRIBUTIONS))
+    parser.add_argument("--algorithms", nargs="+", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="結果を書き出す JSON ファイル")
+    parser.add_argument("--compare", help="比較対象の JSON ファイル（遅くなった組み合わせを表示）")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.distributions, args.algorithms, args.repeat, args.seed,
+                 out=args.out)
+    if args.out:
+        _write_report(report, args.out)
+        print(f"結果を {args.out} に保存しました。")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())